@@ -0,0 +1,86 @@
+"""
+Completion helpers for Food Service 2025 agents
+Run an agent's prepared chat completion, either whole or streamed
+"""
+
+import logging
+from typing import Dict, Any, Callable, Generator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PrepareResponse = Callable[[str], Tuple[Dict[str, Any], Optional[Dict[str, Any]]]]
+ErrorResponse = Callable[[Exception], Dict[str, Any]]
+
+
+def complete_query(openai_client, query: str, prepare: PrepareResponse,
+                   error_response: ErrorResponse) -> Dict[str, Any]:
+    """
+    Answer a query with a single chat completion
+    
+    Args:
+        openai_client: OpenAI client used for the completion
+        query: User query
+        prepare: Agent callback returning the response dictionary and the
+            completion arguments, or None when the response is already final
+        error_response: Agent callback building the failure response
+    
+    Returns:
+        Response dictionary with the completion text filled in
+    """
+    try:
+        result, completion = prepare(query)
+        
+        if completion:
+            response = openai_client.chat.completions.create(**completion)
+            result["response"] = response.choices[0].message.content.strip()
+        
+        return result
+        
+    except Exception as e:
+        result = error_response(e)
+        logger.error(f"Error processing query in {result['agent']} agent: {str(e)}")
+        return result
+
+
+def stream_completion(openai_client, query: str, prepare: PrepareResponse,
+                      error_response: ErrorResponse) -> Generator[str, None, Dict[str, Any]]:
+    """
+    Answer a query, yielding the response text as it is generated
+    
+    Args:
+        openai_client: OpenAI client used for the completion
+        query: User query
+        prepare: Agent callback returning the response dictionary and the
+            completion arguments, or None when the response is already final
+        error_response: Agent callback building the failure response
+    
+    Returns:
+        The same response dictionary as complete_query, once the stream ends
+    """
+    try:
+        result, completion = prepare(query)
+        
+        if completion:
+            parts = []
+            stream = openai_client.chat.completions.create(**completion, stream=True)
+            try:
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+            finally:
+                # Also reached when the consumer closes this generator early
+                # (client disconnect), so the upstream connection is released
+                stream.close()
+            result["response"] = "".join(parts).strip()
+        else:
+            yield result["response"]
+        
+        return result
+        
+    except Exception as e:
+        result = error_response(e)
+        logger.error(f"Error streaming query in {result['agent']} agent: {str(e)}")
+        yield result["response"]
+        return result
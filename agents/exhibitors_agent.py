@@ -5,11 +5,24 @@ Handles exhibitor-specific queries with exact data extraction
 
 import logging
 import openai
-from typing import Dict, Any, List
+from typing import Dict, Any, Generator, Optional, Tuple
+from agents.completion import complete_query, stream_completion
 from tools.exhibitor_query import ExhibitorQueryTool
 
 logger = logging.getLogger(__name__)
 
+PROMPT_TEMPLATE = """\
+Formatea la siguiente información de expositores de Food Service 2025.
+NO agregues información que no esté presente.
+NO inventes datos.
+Solo mejora la presentación y añade emojis apropiados.
+
+Información:
+{formatted_response}
+
+Consulta original: {query}
+"""
+
 class ExhibitorsAgent:
     def __init__(self, openai_api_key: str):
         self.openai_client = openai.OpenAI(api_key=openai_api_key)
@@ -21,77 +34,81 @@ class ExhibitorsAgent:
         Process exhibitor-specific queries
         Returns only exact data, never invents information
         """
-        try:
-            # Extract exhibitor data based on query
-            exhibitor_data = self.exhibitor_tool.extract_exhibitor_info(query)
-            
-            if not exhibitor_data["companies"] and not exhibitor_data["stats"]:
-                return {
-                    "agent": self.agent_type,
-                    "response": "🏢 No se encontraron datos específicos de expositores para esta consulta.",
-                    "data": exhibitor_data,
-                    "success": True
-                }
-            
-            # Format response with exact data
-            response_parts = []
-            
-            if exhibitor_data["companies"]:
-                response_parts.append("🏢 **Empresas expositoras encontradas:**")
-                for company in exhibitor_data["companies"][:10]:  # Limit to 10
-                    stand_info = f" (Stand: {company['stand']})" if company.get('stand') else ""
-                    response_parts.append(f"• {company['name']}{stand_info}")
-            
-            if exhibitor_data["stats"]:
-                response_parts.append("\n📊 **Estadísticas de expositores:**")
-                for stat_key, stat_value in exhibitor_data["stats"].items():
-                    response_parts.append(f"• {stat_key}: {stat_value}")
+        return complete_query(self.openai_client, query, self._prepare_response, self._error_response)
+    
+    def stream_query(self, query: str) -> Generator[str, None, Dict[str, Any]]:
+        """
+        Process an exhibitor query, yielding the response text as it is generated
+        
+        Returns:
+            The same response dictionary as process_query, once the stream ends
+        """
+        return stream_completion(self.openai_client, query, self._prepare_response, self._error_response)
+    
+    def _prepare_response(self, query: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Extract the exhibitor data and build the formatting request for a query
+        
+        Returns:
+            Response dictionary and the chat completion arguments, or None when
+            the response is already final and no completion is needed
+        """
+        # Extract exhibitor data based on query
+        exhibitor_data = self.exhibitor_tool.extract_exhibitor_info(query)
+        result = {
+            "agent": self.agent_type,
+            "response": "",
+            "data": exhibitor_data,
+            "success": True
+        }
+        
+        if not exhibitor_data["companies"] and not exhibitor_data["stats"]:
+            result["response"] = "🏢 No se encontraron datos específicos de expositores para esta consulta."
+            return result, None
             
-            # Use GPT only for formatting and structure, not for inventing data
-            if response_parts:
-                formatted_response = "\n".join(response_parts)
-                
-                prompt = f"""
-                Formatea la siguiente información de expositores de Food Service 2025.
-                NO agregues información que no esté presente.
-                NO inventes datos.
-                Solo mejora la presentación y añade emojis apropiados.
-                
-                Información:
-                {formatted_response}
-                
-                Consulta original: {query}
-                """
+        # Format response with exact data
+        response_parts = []
+        
+        if exhibitor_data["companies"]:
+            response_parts.append("🏢 **Empresas expositoras encontradas:**")
+            for company in exhibitor_data["companies"][:10]:  # Limit to 10
+                stand_info = f" (Stand: {company['stand']})" if company.get('stand') else ""
+                response_parts.append(f"• {company['name']}{stand_info}")
                 
-                gpt_response = self.openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "Eres un formateador de datos. Solo mejora la presentación sin agregar información nueva."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=400,
-                    temperature=0.1
-                )
+        if exhibitor_data["stats"]:
+            response_parts.append("\n📊 **Estadísticas de expositores:**")
+            for stat_key, stat_value in exhibitor_data["stats"].items():
+                response_parts.append(f"• {stat_key}: {stat_value}")
                 
-                final_response = gpt_response.choices[0].message.content.strip()
-            else:
-                final_response = "🏢 No se encontraron datos específicos de expositores."
-            
-            return {
-                "agent": self.agent_type,
-                "response": final_response,
-                "data": exhibitor_data,
-                "success": True
-            }
+        if not response_parts:
+            result["response"] = "🏢 No se encontraron datos específicos de expositores."
+            return result, None
             
-        except Exception as e:
-            logger.error(f"Error in ExhibitorsAgent.process_query: {str(e)}")
-            return {
-                "agent": self.agent_type,
-                "response": f"❌ Error al procesar consulta de expositores: {str(e)}",
-                "data": {"companies": [], "stats": {}},
-                "success": False
-            }
+        # Use GPT only for formatting and structure, not for inventing data
+        formatted_response = "\n".join(response_parts)
+        
+        prompt = PROMPT_TEMPLATE.format(formatted_response=formatted_response, query=query)
+        
+        completion = {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {"role": "system", "content": "Eres un formateador de datos. Solo mejora la presentación sin agregar información nueva."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 400,
+            "temperature": 0.1
+        }
+        
+        return result, completion
+    
+    def _error_response(self, error: Exception) -> Dict[str, Any]:
+        """Build the failure response for an error raised while processing"""
+        return {
+            "agent": self.agent_type,
+            "response": f"❌ Error al procesar consulta de expositores: {str(error)}",
+            "data": {"companies": [], "stats": {}},
+            "success": False
+        }
     
     def refresh_data(self) -> Dict[str, Any]:
         """Refresh the exhibitor data index"""
@@ -5,11 +5,26 @@ Handles general document searches and queries
 
 import logging
 import openai
-from typing import Dict, Any, List
+from typing import Dict, Any, Generator, Optional, Tuple
+from agents.completion import complete_query, stream_completion
 from tools.document_search import DocumentSearchTool
 
 logger = logging.getLogger(__name__)
 
+PROMPT_TEMPLATE = """\
+Eres un asistente especializado en Food Service 2025.
+Responde la siguiente consulta basándote únicamente en la información proporcionada.
+Mantén la respuesta concisa, máximo 3 párrafos.
+Usa emojis apropiados para mejorar la experiencia del usuario.
+
+Consulta: {query}
+
+Información disponible:
+{context}
+
+Respuesta:
+"""
+
 class GeneralAgent:
     def __init__(self, openai_api_key: str):
         self.openai_client = openai.OpenAI(api_key=openai_api_key)
@@ -21,61 +36,67 @@ class GeneralAgent:
         Process a general query using document search
         Returns maximum 3 paragraphs response
         """
-        try:
-            # Search for relevant documents
-            search_results = self.document_search.search(query)
-            
-            if not search_results:
-                return {
-                    "agent": self.agent_type,
-                    "response": "📋 No se encontró información relevante en los documentos generales.",
-                    "sources": [],
-                    "success": True
-                }
-            
-            # Prepare context for GPT
-            context = "\n".join([f"Documento: {result['file']}\nContenido: {result['content']}" 
-                               for result in search_results[:3]])
-            
-            prompt = f"""
-            Eres un asistente especializado en Food Service 2025. 
-            Responde la siguiente consulta basándote únicamente en la información proporcionada.
-            Mantén la respuesta concisa, máximo 3 párrafos.
-            Usa emojis apropiados para mejorar la experiencia del usuario.
-            
-            Consulta: {query}
-            
-            Información disponible:
-            {context}
-            
-            Respuesta:
-            """
-            
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "Eres un asistente experto en eventos de Food Service. Responde de manera concisa y útil."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.3
-            )
-            
+        return complete_query(self.openai_client, query, self._prepare_response, self._error_response)
+    
+    def stream_query(self, query: str) -> Generator[str, None, Dict[str, Any]]:
+        """
+        Process a general query, yielding the response text as it is generated
+        
+        Returns:
+            The same response dictionary as process_query, once the stream ends
+        """
+        return stream_completion(self.openai_client, query, self._prepare_response, self._error_response)
+    
+    def _prepare_response(self, query: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Search the documents and build the completion request for a query
+        
+        Returns:
+            Response dictionary and the chat completion arguments, or None when
+            the response is already final and no completion is needed
+        """
+        # Search for relevant documents
+        search_results = self.document_search.search(query)
+        
+        if not search_results:
             return {
                 "agent": self.agent_type,
-                "response": response.choices[0].message.content.strip(),
-                "sources": [result['file'] for result in search_results[:3]],
+                "response": "📋 No se encontró información relevante en los documentos generales.",
+                "sources": [],
                 "success": True
-            }
+            }, None
             
-        except Exception as e:
-            logger.error(f"Error in GeneralAgent.process_query: {str(e)}")
-            return {
-                "agent": self.agent_type,
-                "response": f"❌ Error al procesar la consulta: {str(e)}",
-                "sources": [],
-                "success": False
-            }
+        # Prepare context for GPT
+        context = "\n".join([f"Documento: {result['file']}\nContenido: {result['content']}" 
+                           for result in search_results[:3]])
+                           
+        prompt = PROMPT_TEMPLATE.format(query=query, context=context)
+        
+        completion = {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {"role": "system", "content": "Eres un asistente experto en eventos de Food Service. Responde de manera concisa y útil."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 500,
+            "temperature": 0.3
+        }
+        
+        return {
+            "agent": self.agent_type,
+            "response": "",
+            "sources": [result['file'] for result in search_results[:3]],
+            "success": True
+        }, completion
+    
+    def _error_response(self, error: Exception) -> Dict[str, Any]:
+        """Build the failure response for an error raised while processing"""
+        return {
+            "agent": self.agent_type,
+            "response": f"❌ Error al procesar la consulta: {str(error)}",
+            "sources": [],
+            "success": False
+        }
     
     def refresh_data(self) -> Dict[str, Any]:
         """Refresh the document search index"""
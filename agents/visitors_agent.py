@@ -5,11 +5,24 @@ Handles visitor-specific queries with exact data extraction
 
 import logging
 import openai
-from typing import Dict, Any, List
+from typing import Dict, Any, Generator, Optional, Tuple
+from agents.completion import complete_query, stream_completion
 from tools.visitor_query import VisitorQueryTool
 
 logger = logging.getLogger(__name__)
 
+PROMPT_TEMPLATE = """\
+Formatea la siguiente información de visitantes de Food Service 2025.
+NO agregues información que no esté presente.
+NO inventes números o datos.
+Solo mejora la presentación y añade emojis apropiados.
+
+Información:
+{formatted_response}
+
+Consulta original: {query}
+"""
+
 class VisitorsAgent:
     def __init__(self, openai_api_key: str):
         self.openai_client = openai.OpenAI(api_key=openai_api_key)
@@ -21,85 +34,89 @@ class VisitorsAgent:
         Process visitor-specific queries
         Returns only exact data, never invents information
         """
-        try:
-            # Extract visitor data based on query
-            visitor_data = self.visitor_tool.extract_visitor_info(query)
-            
-            if not any([visitor_data["daily_stats"], visitor_data["demographics"], 
-                       visitor_data["total_visitors"], visitor_data["trends"]]):
-                return {
-                    "agent": self.agent_type,
-                    "response": "👥 No se encontraron datos específicos de visitantes para esta consulta.",
-                    "data": visitor_data,
-                    "success": True
-                }
-            
-            # Format response with exact data
-            response_parts = []
-            
-            if visitor_data["total_visitors"]:
-                response_parts.append(f"👥 **Total de visitantes:** {visitor_data['total_visitors']}")
-            
-            if visitor_data["daily_stats"]:
-                response_parts.append("\n📅 **Estadísticas por día:**")
-                for day, count in visitor_data["daily_stats"].items():
-                    response_parts.append(f"• {day}: {count} visitantes")
-            
-            if visitor_data["demographics"]:
-                response_parts.append("\n📊 **Demografía de visitantes:**")
-                for demo_key, demo_value in visitor_data["demographics"].items():
-                    response_parts.append(f"• {demo_key}: {demo_value}")
+        return complete_query(self.openai_client, query, self._prepare_response, self._error_response)
+    
+    def stream_query(self, query: str) -> Generator[str, None, Dict[str, Any]]:
+        """
+        Process a visitor query, yielding the response text as it is generated
+        
+        Returns:
+            The same response dictionary as process_query, once the stream ends
+        """
+        return stream_completion(self.openai_client, query, self._prepare_response, self._error_response)
+    
+    def _prepare_response(self, query: str) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+        """
+        Extract the visitor data and build the formatting request for a query
+        
+        Returns:
+            Response dictionary and the chat completion arguments, or None when
+            the response is already final and no completion is needed
+        """
+        # Extract visitor data based on query
+        visitor_data = self.visitor_tool.extract_visitor_info(query)
+        result = {
+            "agent": self.agent_type,
+            "response": "",
+            "data": visitor_data,
+            "success": True
+        }
+        
+        if not any([visitor_data["daily_stats"], visitor_data["demographics"], 
+                   visitor_data["total_visitors"], visitor_data["trends"]]):
+            result["response"] = "👥 No se encontraron datos específicos de visitantes para esta consulta."
+            return result, None
             
-            if visitor_data["trends"]:
-                response_parts.append("\n📈 **Tendencias:**")
-                for trend in visitor_data["trends"]:
-                    response_parts.append(f"• {trend}")
+        # Format response with exact data
+        response_parts = []
+        
+        if visitor_data["total_visitors"]:
+            response_parts.append(f"👥 **Total de visitantes:** {visitor_data['total_visitors']}")
             
-            # Use GPT only for formatting, not for inventing data
-            if response_parts:
-                formatted_response = "\n".join(response_parts)
-                
-                prompt = f"""
-                Formatea la siguiente información de visitantes de Food Service 2025.
-                NO agregues información que no esté presente.
-                NO inventes números o datos.
-                Solo mejora la presentación y añade emojis apropiados.
-                
-                Información:
-                {formatted_response}
+        if visitor_data["daily_stats"]:
+            response_parts.append("\n📅 **Estadísticas por día:**")
+            for day, count in visitor_data["daily_stats"].items():
+                response_parts.append(f"• {day}: {count} visitantes")
                 
-                Consulta original: {query}
-                """
+        if visitor_data["demographics"]:
+            response_parts.append("\n📊 **Demografía de visitantes:**")
+            for demo_key, demo_value in visitor_data["demographics"].items():
+                response_parts.append(f"• {demo_key}: {demo_value}")
                 
-                gpt_response = self.openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "Eres un formateador de datos. Solo mejora la presentación sin agregar información nueva."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    max_tokens=400,
-                    temperature=0.1
-                )
+        if visitor_data["trends"]:
+            response_parts.append("\n📈 **Tendencias:**")
+            for trend in visitor_data["trends"]:
+                response_parts.append(f"• {trend}")
                 
-                final_response = gpt_response.choices[0].message.content.strip()
-            else:
-                final_response = "👥 No se encontraron datos específicos de visitantes."
-            
-            return {
-                "agent": self.agent_type,
-                "response": final_response,
-                "data": visitor_data,
-                "success": True
-            }
+        if not response_parts:
+            result["response"] = "👥 No se encontraron datos específicos de visitantes."
+            return result, None
             
-        except Exception as e:
-            logger.error(f"Error in VisitorsAgent.process_query: {str(e)}")
-            return {
-                "agent": self.agent_type,
-                "response": f"❌ Error al procesar consulta de visitantes: {str(e)}",
-                "data": {"daily_stats": {}, "demographics": {}, "total_visitors": None, "trends": []},
-                "success": False
-            }
+        # Use GPT only for formatting, not for inventing data
+        formatted_response = "\n".join(response_parts)
+        
+        prompt = PROMPT_TEMPLATE.format(formatted_response=formatted_response, query=query)
+        
+        completion = {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {"role": "system", "content": "Eres un formateador de datos. Solo mejora la presentación sin agregar información nueva."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": 400,
+            "temperature": 0.1
+        }
+        
+        return result, completion
+    
+    def _error_response(self, error: Exception) -> Dict[str, Any]:
+        """Build the failure response for an error raised while processing"""
+        return {
+            "agent": self.agent_type,
+            "response": f"❌ Error al procesar consulta de visitantes: {str(error)}",
+            "data": {"daily_stats": {}, "demographics": {}, "total_visitors": None, "trends": []},
+            "success": False
+        }
     
     def refresh_data(self) -> Dict[str, Any]:
         """Refresh the visitor data index"""
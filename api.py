@@ -3,15 +3,18 @@ FastAPI REST API for Food Service 2025 Multi-Agent System
 Provides REST endpoints for interacting with the multi-agent system
 """
 
+import asyncio
 import logging
 import os
-from typing import Dict, Any, Optional
+from typing import Optional
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, Query, Path
+import anyio
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
 from orchestrator import FoodServiceOrchestrator
 
@@ -28,7 +31,8 @@ app = FastAPI(
     description="Sistema multi-agente para consultas sobre Food Service 2025",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=ORJSONResponse  # orjson encodes responses much faster than stdlib json
 )
 
 # Configure CORS
@@ -55,6 +59,10 @@ redis_config = {
 
 orchestrator = FoodServiceOrchestrator(openai_api_key, redis_config)
 
+# Queries processed at once; further requests wait for a free slot instead of
+# piling more agent calls and OpenAI requests onto the worker threads
+query_slots = asyncio.Semaphore(int(os.getenv('MAX_CONCURRENT_QUERIES', 16)))
+
 # Pydantic models
 class QueryRequest(BaseModel):
     query: str = Field(..., description="Consulta del usuario", min_length=1)
@@ -64,6 +72,16 @@ class QueryRequest(BaseModel):
 class QueryResponse(BaseModel):
     response: str
 
+VALID_AGENT_TYPES = frozenset({'general', 'exhibitors', 'visitors'})
+
+def validate_agent_type(agent_type: Optional[str]) -> None:
+    """Reject an explicit agent_type that no agent handles"""
+    if agent_type and agent_type not in VALID_AGENT_TYPES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid agent_type. Must be one of: general, exhibitors, visitors"
+        )
+
 # API Endpoints
 
 @app.post("/query", response_model=QueryResponse)
@@ -75,28 +93,25 @@ async def process_query(request: QueryRequest):
     - **agent_type**: Tipo de agente específico (opcional: general, exhibitors, visitors)
     - **use_cache**: Si usar cache para la consulta (por defecto: true)
     """
+    logger.info(f"Processing query: {request.query[:100]}...")
+    
+    # Validate up front, so the try below only covers unexpected failures
+    validate_agent_type(request.agent_type)
+    
     try:
-        logger.info(f"Processing query: {request.query[:100]}...")
-        
-        # Validate agent type if provided
-        if request.agent_type and request.agent_type not in ['general', 'exhibitors', 'visitors']:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid agent_type. Must be one of: general, exhibitors, visitors"
+        # Process query; the orchestrator blocks on OpenAI, Redis and search,
+        # so run it in the worker thread pool to keep the event loop free
+        async with query_slots:
+            result = await run_in_threadpool(
+                orchestrator.process_query,
+                query=request.query,
+                agent_type=request.agent_type,
+                use_cache=request.use_cache
             )
         
-        # Process query
-        result = orchestrator.process_query(
-            query=request.query,
-            agent_type=request.agent_type,
-            use_cache=request.use_cache
-        )
-        
         # Return only the response text
         return QueryResponse(response=result.get("response", ""))
         
-    except HTTPException:
-        raise
     except Exception as e:
         logger.error(f"Error processing query: {str(e)}")
         raise HTTPException(
@@ -104,10 +119,44 @@ async def process_query(request: QueryRequest):
             detail=f"Error interno del servidor: {str(e)}"
         )
 
+@app.post("/query/stream")
+async def process_query_stream(request: QueryRequest):
+    """
+    Procesar consulta y enviar la respuesta en fragmentos a medida que se genera
+    
+    Acepta los mismos campos que **/query**; la respuesta es texto plano transmitido
+    por partes, de modo que el cliente ve el inicio sin esperar la respuesta completa.
+    """
+    logger.info(f"Streaming query: {request.query[:100]}...")
+    
+    # Validate agent type if provided
+    validate_agent_type(request.agent_type)
+    
+    async def stream_chunks():
+        # The slot is held for the whole stream; the orchestrator yields
+        # synchronously, so each chunk is pulled in the worker thread pool
+        async with query_slots:
+            chunks = orchestrator.process_query_stream(
+                query=request.query,
+                agent_type=request.agent_type,
+                use_cache=request.use_cache
+            )
+            try:
+                async for chunk in iterate_in_threadpool(chunks):
+                    yield chunk
+            finally:
+                # On client disconnect the generator is left suspended; close it
+                # now (shielded from the cancellation) so the agent's upstream
+                # stream is released instead of waiting for garbage collection
+                with anyio.CancelScope(shield=True):
+                    await run_in_threadpool(chunks.close)
+                    
+    return StreamingResponse(stream_chunks(), media_type="text/plain; charset=utf-8")
+
 # Error handlers
 @app.exception_handler(404)
 async def not_found_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=404,
         content={
             "error": "Endpoint no encontrado",
@@ -119,7 +168,7 @@ async def not_found_handler(request, exc):
 @app.exception_handler(500)
 async def internal_error_handler(request, exc):
     logger.error(f"Internal server error: {str(exc)}")
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Error interno del servidor",
@@ -131,7 +180,7 @@ async def internal_error_handler(request, exc):
 # Startup event
 @app.on_event("startup")
 async def startup_event():
-    logger.info("🚀 Food Service 2025 API started - Single endpoint: POST /query")
+    logger.info("🚀 Food Service 2025 API started - Endpoints: POST /query, POST /query/stream")
     logger.info(f"📊 Orchestrator initialized with {len(orchestrator.agents)} agents")
     logger.info(f"💾 Redis connected: {orchestrator.redis_manager.is_connected()}")
 
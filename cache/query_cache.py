@@ -3,6 +3,7 @@ Intelligent Query Cache for Food Service 2025
 Implements similarity-based caching with learning patterns
 """
 
+import heapq
 import hashlib
 import logging
 import time
@@ -35,16 +36,21 @@ class QueryCache:
         """Normalize query for better matching"""
         return query.lower().strip().replace("  ", " ")
     
-    def _generate_cache_key(self, query: str, agent_type: str = "general") -> str:
-        """Generate cache key for query"""
+    def _query_hash(self, query: str) -> str:
+        """Hash the normalized query; shared by the cache and similarity keys"""
         normalized = self._normalize_query(query)
-        query_hash = hashlib.md5(normalized.encode()).hexdigest()
+        return hashlib.md5(normalized.encode()).hexdigest()
+        
+    def _generate_cache_key(self, query: str, agent_type: str = "general",
+                            query_hash: Optional[str] = None) -> str:
+        """Generate cache key for query"""
+        query_hash = query_hash or self._query_hash(query)
         return f"{self.QUERY_PREFIX}{agent_type}:{query_hash}"
     
-    def _generate_similarity_key(self, query: str, agent_type: str = "general") -> str:
+    def _generate_similarity_key(self, query: str, agent_type: str = "general",
+                                 query_hash: Optional[str] = None) -> str:
         """Generate similarity tracking key"""
-        normalized = self._normalize_query(query)
-        query_hash = hashlib.md5(normalized.encode()).hexdigest()
+        query_hash = query_hash or self._query_hash(query)
         return f"{self.SIMILARITY_PREFIX}{agent_type}:{query_hash}"
     
     def _calculate_similarity(self, query1: str, query2: str) -> float:
@@ -64,8 +70,8 @@ class QueryCache:
         try:
             similarity_keys = self.redis.get_keys_pattern(pattern)
             
-            for sim_key in similarity_keys:
-                stored_data = self.redis.get(sim_key)
+            # Fetch every similarity record in one MGET instead of a GET per key
+            for stored_data in self.redis.get_many(similarity_keys):
                 if stored_data and isinstance(stored_data, dict):
                     stored_query = stored_data.get("original_query", "")
                     similarity = self._calculate_similarity(query, stored_query)
@@ -74,9 +80,8 @@ class QueryCache:
                         cache_key = stored_data.get("cache_key", "")
                         similar_queries.append((stored_query, similarity, cache_key))
             
-            # Sort by similarity (descending)
-            similar_queries.sort(key=lambda x: x[1], reverse=True)
-            return similar_queries[:3]  # Return top 3 similar queries
+            # Return top 3 similar queries by similarity (descending)
+            return heapq.nlargest(3, similar_queries, key=lambda x: x[1])
             
         except Exception as e:
             logger.error(f"Error finding similar queries: {str(e)}")
@@ -137,33 +142,36 @@ class QueryCache:
         ttl = ttl or self.default_ttl
         
         try:
-            # Store main cache entry
-            cache_key = self._generate_cache_key(query, agent_type)
+            # Main cache entry; both records share one wall-clock timestamp
+            now = time.time()
+            query_hash = self._query_hash(query)
+            cache_key = self._generate_cache_key(query, agent_type, query_hash)
             cache_data = {
                 **response,
-                "cached_at": time.time(),
+                "cached_at": now,
                 "query": query,
                 "agent_type": agent_type,
                 "ttl": ttl
             }
             
-            success = self.redis.set(cache_key, cache_data, ex=ttl)
+            # Similarity tracking data
+            similarity_key = self._generate_similarity_key(query, agent_type, query_hash)
+            similarity_data = {
+                "original_query": query,
+                "cache_key": cache_key,
+                "agent_type": agent_type,
+                "created_at": now
+            }
+            
+            # Entry, similarity data and a fresh hit counter go out in one pipeline
+            counter_key = f"{self.COUNTER_PREFIX}{cache_key}"
+            success = self.redis.set_many({
+                cache_key: cache_data,
+                similarity_key: similarity_data,
+                counter_key: 0
+            }, ex=ttl)
             
             if success:
-                # Store similarity tracking data
-                similarity_key = self._generate_similarity_key(query, agent_type)
-                similarity_data = {
-                    "original_query": query,
-                    "cache_key": cache_key,
-                    "agent_type": agent_type,
-                    "created_at": time.time()
-                }
-                self.redis.set(similarity_key, similarity_data, ex=ttl)
-                
-                # Initialize hit counter
-                counter_key = f"{self.COUNTER_PREFIX}{cache_key}"
-                self.redis.set(counter_key, 0, ex=ttl)
-                
                 logger.info(f"Cached response for query: {query[:50]}...")
                 return True
             
@@ -188,9 +196,7 @@ class QueryCache:
             deleted_count = 0
             for pattern in patterns:
                 keys = self.redis.get_keys_pattern(pattern)
-                for key in keys:
-                    if self.redis.delete(key):
-                        deleted_count += 1
+                deleted_count += self.redis.delete_many(keys)
             
             logger.info(f"Invalidated {deleted_count} cache entries for agent: {agent_type}")
             return True
@@ -220,8 +226,7 @@ class QueryCache:
                 counter_keys = self.redis.get_keys_pattern(counter_pattern)
                 
                 total_hits = 0
-                for counter_key in counter_keys:
-                    hits = self.redis.get(counter_key)
+                for hits in self.redis.get_many(counter_keys):
                     if hits and isinstance(hits, (int, str)):
                         total_hits += int(hits)
                 
@@ -253,9 +258,7 @@ class QueryCache:
             deleted_count = 0
             for pattern in patterns:
                 keys = self.redis.get_keys_pattern(pattern)
-                for key in keys:
-                    if self.redis.delete(key):
-                        deleted_count += 1
+                deleted_count += self.redis.delete_many(keys)
             
             logger.info(f"Cleared {deleted_count} cache entries")
             return True
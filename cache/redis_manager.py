@@ -6,7 +6,8 @@ Handles Redis connections and basic operations
 import redis
 import json
 import logging
-from typing import Any, Optional, Dict
+import time
+from typing import Any, Optional, Dict, List
 import os
 
 logger = logging.getLogger(__name__)
@@ -17,13 +18,19 @@ class RedisManager:
                  port: int = None, 
                  db: int = 0, 
                  password: str = None,
-                 decode_responses: bool = True):
+                 decode_responses: bool = True,
+                 health_check_interval: int = 30):
         """Initialize Redis connection"""
         self.host = host or os.getenv('REDIS_HOST', 'localhost')
         self.port = port or int(os.getenv('REDIS_PORT', 6379))
         self.db = db
         self.password = password or os.getenv('REDIS_PASSWORD')
         
+        # Seconds a connectivity check stays valid, so operations don't each pay a PING
+        self.health_check_interval = health_check_interval
+        self._last_health_check = 0.0
+        self._healthy = False
+        
         try:
             self.redis_client = redis.Redis(
                 host=self.host,
@@ -32,24 +39,35 @@ class RedisManager:
                 password=self.password,
                 decode_responses=decode_responses,
                 socket_connect_timeout=5,
-                socket_timeout=5
+                socket_timeout=5,
+                # Pooled connections idle longer than this are checked before reuse
+                health_check_interval=health_check_interval
             )
             # Test connection
             self.redis_client.ping()
+            self._healthy = True
+            self._last_health_check = time.monotonic()
             logger.info(f"Successfully connected to Redis at {self.host}:{self.port}")
         except Exception as e:
             logger.error(f"Failed to connect to Redis: {str(e)}")
             self.redis_client = None
     
     def is_connected(self) -> bool:
-        """Check if Redis is connected"""
+        """Check if Redis is connected, reusing the last check within health_check_interval"""
         if not self.redis_client:
             return False
+            
+        now = time.monotonic()
+        if now - self._last_health_check < self.health_check_interval:
+            return self._healthy
+            
         try:
             self.redis_client.ping()
-            return True
+            self._healthy = True
         except:
-            return False
+            self._healthy = False
+        self._last_health_check = now
+        return self._healthy
     
     def set(self, key: str, value: Any, ex: int = None) -> bool:
         """Set a key-value pair with optional expiration"""
@@ -67,6 +85,24 @@ class RedisManager:
             logger.error(f"Error setting Redis key {key}: {str(e)}")
             return False
     
+    def set_many(self, items: Dict[str, Any], ex: int = None) -> bool:
+        """Set several key-value pairs in a single round trip, with optional expiration"""
+        if not self.is_connected():
+            logger.warning("Redis not connected, cannot set values")
+            return False
+            
+        try:
+            # MULTI/EXEC pipeline: one round trip, and the keys are written together or not at all
+            pipe = self.redis_client.pipeline()
+            for key, value in items.items():
+                if isinstance(value, (dict, list)):
+                    value = json.dumps(value, ensure_ascii=False)
+                pipe.set(key, value, ex=ex)
+            return all(pipe.execute())
+        except Exception as e:
+            logger.error(f"Error setting Redis keys {list(items)}: {str(e)}")
+            return False
+    
     def get(self, key: str) -> Optional[Any]:
         """Get value by key"""
         if not self.is_connected():
@@ -87,6 +123,24 @@ class RedisManager:
             logger.error(f"Error getting Redis key {key}: {str(e)}")
             return None
     
+    def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values in one round trip (MGET); missing keys come back as None"""
+        if not self.is_connected() or not keys:
+            return [None] * len(keys)
+            
+        try:
+            values = []
+            for value in self.redis_client.mget(keys):
+                # Try to parse JSON
+                try:
+                    values.append(json.loads(value) if value is not None else None)
+                except json.JSONDecodeError:
+                    values.append(value)
+            return values
+        except Exception as e:
+            logger.error(f"Error getting Redis keys: {str(e)}")
+            return [None] * len(keys)
+    
     def delete(self, key: str) -> bool:
         """Delete a key"""
         if not self.is_connected():
@@ -99,6 +153,19 @@ class RedisManager:
             logger.error(f"Error deleting Redis key {key}: {str(e)}")
             return False
     
+    def delete_many(self, keys: List[str], batch_size: int = 500) -> int:
+        """Delete keys in batches, one round trip per batch; returns the number deleted"""
+        if not self.is_connected() or not keys:
+            return 0
+            
+        deleted = 0
+        try:
+            for start in range(0, len(keys), batch_size):
+                deleted += self.redis_client.delete(*keys[start:start + batch_size])
+        except Exception as e:
+            logger.error(f"Error deleting Redis keys: {str(e)}")
+        return deleted
+    
     def exists(self, key: str) -> bool:
         """Check if key exists"""
         if not self.is_connected():
@@ -127,7 +194,9 @@ class RedisManager:
             return []
         
         try:
-            return self.redis_client.keys(pattern)
+            # SCAN walks the keyspace incrementally instead of blocking the server like KEYS;
+            # it may return a key more than once, so deduplicate keeping first-seen order
+            return list(dict.fromkeys(self.redis_client.scan_iter(match=pattern, count=1000)))
         except Exception as e:
             logger.error(f"Error getting keys with pattern {pattern}: {str(e)}")
             return []
@@ -4,13 +4,37 @@ Main orchestrator for routing queries to appropriate agents
 """
 
 import logging
-import os
-from typing import Dict, Any, Optional
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Iterator
 from agents import GeneralAgent, ExhibitorsAgent, VisitorsAgent
 from cache import RedisManager, QueryCache
 
 logger = logging.getLogger(__name__)
 
+# Static agent descriptions served by get_available_agents
+AGENT_CATALOG = (
+    {
+        'type': 'general',
+        'name': 'Agente General',
+        'description': 'Maneja consultas generales sobre Food Service 2025',
+        'keywords': 'información general, documentos, preguntas generales'
+    },
+    {
+        'type': 'exhibitors',
+        'name': 'Agente de Expositores',
+        'description': 'Especializado en información de empresas expositoras',
+        'keywords': 'expositores, empresas, stands, marcas'
+    },
+    {
+        'type': 'visitors',
+        'name': 'Agente de Visitantes',
+        'description': 'Especializado en estadísticas y datos de visitantes',
+        'keywords': 'visitantes, asistencia, demografía, estadísticas'
+    }
+)
+
 class FoodServiceOrchestrator:
     def __init__(self, openai_api_key: str, redis_config: Dict[str, Any] = None):
         """
@@ -26,6 +50,9 @@ class FoodServiceOrchestrator:
         redis_config = redis_config or {}
         self.redis_manager = RedisManager(**redis_config)
         self.query_cache = QueryCache(self.redis_manager)
+        # Cache writes happen after the response is returned; a single worker
+        # keeps them, and any invalidation queued behind them, in order
+        self.cache_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-cache")
         
         # Initialize agents
         self.agents = {
@@ -55,6 +82,20 @@ class FoodServiceOrchestrator:
             'participar', 'inscribir', 'registrar', 'información sobre'
         ]
         
+        # Compile keyword lists once so detection is a single regex pass per list
+        self.narrative_pattern = re.compile(
+            '|'.join(re.escape(keyword) for keyword in self.narrative_keywords)
+        )
+        self.keyword_agents = {
+            keyword: agent_type
+            for agent_type, keywords in self.agent_keywords.items()
+            for keyword in keywords
+        }
+        # Lookahead lets overlapping keywords all be reported
+        self.agent_keyword_pattern = re.compile(
+            '(?=(' + '|'.join(re.escape(keyword) for keyword in self.keyword_agents) + '))'
+        )
+        
         logger.info("Food Service 2025 Orchestrator initialized")
     
     def detect_agent_type(self, query: str) -> str:
@@ -70,18 +111,16 @@ class FoodServiceOrchestrator:
         query_lower = query.lower()
         
         # Check if it's a narrative question first
-        for narrative_keyword in self.narrative_keywords:
-            if narrative_keyword in query_lower:
-                logger.info(f"Detected narrative question, using general agent")
-                return 'general'
+        if self.narrative_pattern.search(query_lower):
+            logger.info(f"Detected narrative question, using general agent")
+            return 'general'
         
         # Count matches for specialized agents (only for data extraction queries)
         agent_scores = {'exhibitors': 0, 'visitors': 0}
         
-        for agent_type, keywords in self.agent_keywords.items():
-            for keyword in keywords:
-                if keyword in query_lower:
-                    agent_scores[agent_type] += 1
+        # Each distinct keyword counts once, however often it appears
+        for keyword in set(self.agent_keyword_pattern.findall(query_lower)):
+            agent_scores[self.keyword_agents[keyword]] += 1
         
         # Return specialized agent only if there's a clear match
         best_agent = max(agent_scores.items(), key=lambda x: x[1])
@@ -106,13 +145,7 @@ class FoodServiceOrchestrator:
             Response dictionary
         """
         try:
-            # Auto-detect agent type if not specified
-            if not agent_type:
-                agent_type = self.detect_agent_type(query)
-            
-            # Validate agent type
-            if agent_type not in self.agents:
-                agent_type = 'general'
+            agent_type = self._resolve_agent_type(query, agent_type)
             
             # Check cache first if enabled
             if use_cache:
@@ -125,30 +158,89 @@ class FoodServiceOrchestrator:
             agent = self.agents[agent_type]
             response = agent.process_query(query)
             
-            # Add orchestrator metadata
-            response.update({
-                'orchestrator_version': '1.0',
-                'agent_used': agent_type,
-                'query_processed_at': self._get_timestamp(),
-                'cache_enabled': use_cache
-            })
+            return self._finish_response(query, response, agent_type, use_cache)
+            
+        except Exception as e:
+            logger.error(f"Error processing query: {str(e)}")
+            return self._error_response(agent_type, e)
+    
+    def process_query_stream(self, query: str, agent_type: str = None, use_cache: bool = True) -> Iterator[str]:
+        """
+        Process a query like process_query, yielding the response text as the agent generates it
+        
+        Args:
+            query: User query
+            agent_type: Specific agent type to use (optional)
+            use_cache: Whether to use cache (default: True)
             
-            # Cache the result if successful and cache is enabled
-            if use_cache and response.get('success', False):
-                self.query_cache.set(query, response, agent_type)
+        Yields:
+            Response text chunks; a cached response arrives as a single chunk
+        """
+        try:
+            agent_type = self._resolve_agent_type(query, agent_type)
+            
+            if use_cache:
+                cached_result = self.query_cache.get(query, agent_type)
+                if cached_result:
+                    logger.info(f"Returning cached result for query: {query[:50]}...")
+                    yield cached_result.get('response', '')
+                    return
+                    
+            # The agent's generator returns the complete response once it is exhausted
+            agent = self.agents[agent_type]
+            response = yield from agent.stream_query(query)
             
-            return response
+            self._finish_response(query, response, agent_type, use_cache)
             
+        except GeneratorExit:
+            # Closed before the end (client disconnected); the agent's stream is
+            # released by the close, and the partial response is not cached
+            logger.info(f"Stream closed before completion for query: {query[:50]}...")
+            raise
         except Exception as e:
-            logger.error(f"Error processing query: {str(e)}")
-            return {
-                'agent': agent_type or 'unknown',
-                'response': f"❌ Error del sistema: {str(e)}",
-                'success': False,
-                'error': str(e),
-                'orchestrator_version': '1.0',
-                'query_processed_at': self._get_timestamp()
-            }
+            logger.error(f"Error streaming query: {str(e)}")
+            yield self._error_response(agent_type, e)['response']
+    
+    def _resolve_agent_type(self, query: str, agent_type: str = None) -> str:
+        """Use the requested agent when valid, otherwise detect it from the query"""
+        # Auto-detect agent type if not specified
+        if not agent_type:
+            agent_type = self.detect_agent_type(query)
+            
+        # Validate agent type
+        if agent_type not in self.agents:
+            agent_type = 'general'
+            
+        return agent_type
+    
+    def _finish_response(self, query: str, response: Dict[str, Any], agent_type: str,
+                         use_cache: bool) -> Dict[str, Any]:
+        """Add orchestrator metadata to an agent response and queue it for caching"""
+        # Add orchestrator metadata
+        response.update({
+            'orchestrator_version': '1.0',
+            'agent_used': agent_type,
+            'query_processed_at': self._get_timestamp(),
+            'cache_enabled': use_cache
+        })
+        
+        # Cache the result if successful and cache is enabled, without
+        # holding the caller on the Redis round trips
+        if use_cache and response.get('success', False):
+            self.cache_writer.submit(self.query_cache.set, query, dict(response), agent_type)
+            
+        return response
+    
+    def _error_response(self, agent_type: str, error: Exception) -> Dict[str, Any]:
+        """Build the system error response for a failed query"""
+        return {
+            'agent': agent_type or 'unknown',
+            'response': f"❌ Error del sistema: {str(error)}",
+            'success': False,
+            'error': str(error),
+            'orchestrator_version': '1.0',
+            'query_processed_at': self._get_timestamp()
+        }
     
     def refresh_agent_data(self, agent_type: str) -> Dict[str, Any]:
         """
@@ -173,7 +265,8 @@ class FoodServiceOrchestrator:
             
             # Invalidate cache for this agent
             if refresh_result.get('success', False):
-                self.query_cache.invalidate_agent_cache(agent_type)
+                # Queued behind pending writes so no stale entry lands afterwards
+                self.cache_writer.submit(self.query_cache.invalidate_agent_cache, agent_type).result()
                 refresh_result['cache_invalidated'] = True
             
             return refresh_result
@@ -220,26 +313,8 @@ class FoodServiceOrchestrator:
     def get_available_agents(self) -> Dict[str, Any]:
         """Get list of available agents and their descriptions"""
         return {
-            'agents': [
-                {
-                    'type': 'general',
-                    'name': 'Agente General',
-                    'description': 'Maneja consultas generales sobre Food Service 2025',
-                    'keywords': 'información general, documentos, preguntas generales'
-                },
-                {
-                    'type': 'exhibitors',
-                    'name': 'Agente de Expositores',
-                    'description': 'Especializado en información de empresas expositoras',
-                    'keywords': 'expositores, empresas, stands, marcas'
-                },
-                {
-                    'type': 'visitors',
-                    'name': 'Agente de Visitantes',
-                    'description': 'Especializado en estadísticas y datos de visitantes',
-                    'keywords': 'visitantes, asistencia, demografía, estadísticas'
-                }
-            ],
+            # Shallow copies so callers can't alter the shared catalog
+            'agents': [dict(agent) for agent in AGENT_CATALOG],
             'total_agents': len(self.agents),
             'orchestrator_version': '1.0'
         }
@@ -291,13 +366,13 @@ class FoodServiceOrchestrator:
     
     def _get_timestamp(self) -> str:
         """Get current timestamp in ISO format"""
-        from datetime import datetime
         return datetime.now().isoformat()
     
     def clear_cache(self) -> Dict[str, Any]:
         """Clear all cache data"""
         try:
-            success = self.query_cache.clear_all_cache()
+            # Queued behind pending writes so no stale entry lands afterwards
+            success = self.cache_writer.submit(self.query_cache.clear_all_cache).result()
             return {
                 'success': success,
                 'message': '✅ Cache limpiado correctamente' if success else '❌ Error al limpiar cache',
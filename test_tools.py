@@ -0,0 +1,93 @@
+"""
+Tool tests for Food Service 2025 Multi-Agent System
+Exercise the document tools directly, without the API or OpenAI
+Run with: python -m pytest test_tools.py
+"""
+
+import shutil
+import zlib
+import numpy as np
+import pandas as pd
+import pytest
+
+class FakeEncoder:
+    """Deterministic bag-of-words encoder standing in for SentenceTransformer"""
+    dimension = 64
+    
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dimension
+    
+    def encode(self, texts, normalize_embeddings: bool = False, **kwargs) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimension), dtype='float32')
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                embeddings[row, zlib.crc32(word.encode()) % self.dimension] += 1.0
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.where(norms == 0, 1.0, norms)
+        return embeddings
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in a scratch directory so vector stores and caches stay isolated"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+def write_excel(path, rows, columns):
+    pd.DataFrame(rows, columns=columns).to_excel(path, index=False)
+
+def test_refresh_after_removing_all_files_empties_vector_search(workdir, monkeypatch):
+    import tools.vector_store as vector_store_module
+    from tools.document_search import DocumentSearchTool
+    
+    monkeypatch.delenv('DISABLE_VECTOR_STORE', raising=False)
+    monkeypatch.setattr(vector_store_module, 'SentenceTransformer', FakeEncoder)
+    
+    folder = workdir / "docs"
+    folder.mkdir()
+    write_excel(folder / "horarios.xlsx",
+                [["Apertura de la feria", "09:00"], ["Cierre de la feria", "20:00"]],
+                ["Evento", "Hora"])
+    
+    tool = DocumentSearchTool(str(folder))
+    assert tool.vector_store.search("apertura de la feria", score_threshold=0.1)
+    
+    # Emptied folder
+    (folder / "horarios.xlsx").unlink()
+    tool.refresh_index()
+    assert tool.vector_store.search("apertura de la feria", score_threshold=0.1) == []
+    assert tool.search("apertura de la feria") == []
+    assert tool.vector_store.load_index_meta() == {}
+    
+    # Missing folder
+    write_excel(folder / "horarios.xlsx", [["Apertura de la feria", "09:00"]], ["Evento", "Hora"])
+    tool.refresh_index()
+    assert tool.vector_store.search("apertura de la feria", score_threshold=0.1)
+    shutil.rmtree(folder)
+    tool.refresh_index()
+    assert tool.vector_store.search("apertura de la feria", score_threshold=0.1) == []
+    assert tool.search("apertura de la feria") == []
+
+def test_weekday_before_date_keeps_date_figure():
+    from tools.visitor_query import VisitorQueryTool
+    
+    tool = VisitorQueryTool("folders/missing")
+    data = tool._extract_visitor_data_from_text("Lunes 12/05/2025: 300 visitantes")
+    assert data["daily_stats"] == {'12/05/2025': 300}
+    
+    data = tool._extract_visitor_data_from_text("Lunes: 300\nMartes 450 visitantes")
+    assert data["daily_stats"] == {'Lunes': 300, 'Martes': 450}
+
+def test_excel_trends_include_headers_of_numeric_sheets(workdir):
+    from tools.visitor_query import VisitorQueryTool
+    
+    path = workdir / "visitantes.xlsx"
+    write_excel(path, [[12.5, 4000], [8.0, 3600]], ["Crecimiento 2024 (%)", "Visitantes"])
+    
+    tool = VisitorQueryTool(str(workdir))
+    data = tool._extract_visitor_data_from_excel(str(path))
+    assert data["trends"] == ['Crecimiento 2024 (%) Visitantes']
+    assert data["total_visitors"] == 4000
@@ -6,6 +6,13 @@ Specialized tools for document search and data extraction with vector store
 from .document_search import DocumentSearchTool
 from .exhibitor_query import ExhibitorQueryTool
 from .visitor_query import VisitorQueryTool
-from .vector_store import VectorStore
 
-__all__ = ['DocumentSearchTool', 'ExhibitorQueryTool', 'VisitorQueryTool', 'VectorStore']
\ No newline at end of file
+__all__ = ['DocumentSearchTool', 'ExhibitorQueryTool', 'VisitorQueryTool', 'VectorStore']
+
+
+def __getattr__(name):
+    # VectorStore pulls in faiss and sentence-transformers; load it on first access
+    if name == 'VectorStore':
+        from .vector_store import VectorStore
+        return VectorStore
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
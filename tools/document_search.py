@@ -4,16 +4,26 @@ Handles PDF document search and indexing for general queries
 """
 
 import os
+import heapq
+import hashlib
 import logging
 import PyPDF2
 import pandas as pd
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 from difflib import SequenceMatcher
 import re
-from .vector_store import VectorStore
+from .extraction_cache import load_extraction_cache, save_extraction_cache
 
 logger = logging.getLogger(__name__)
 
+# Keyword tokens: runs of 3+ word characters, so punctuation never sticks to a word
+TOKEN_PATTERN = re.compile(r'\w{3,}')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Bump when text extraction changes: cached text and the vector index built
+# from it are then discarded instead of served stale
+EXTRACTION_VERSION = 1
+
 class DocumentSearchTool:
     def __init__(self, folder_path: str):
         """
@@ -25,6 +35,10 @@ class DocumentSearchTool:
         self.folder_path = folder_path
         self.indexed_documents = {}
         
+        vector_store_name = folder_path.replace('/', '_').replace('\\', '_')
+        # Extracted text per file, reused across restarts while the file is unchanged
+        self.content_cache_path = os.path.join("vector_stores", vector_store_name, "extracted_content.pkl")
+        
         # Initialize vector store with error handling
         disable_vector_store = os.getenv('DISABLE_VECTOR_STORE', 'false').lower() == 'true'
         
@@ -34,7 +48,9 @@ class DocumentSearchTool:
             self.vector_store_enabled = False
         else:
             try:
-                vector_store_name = folder_path.replace('/', '_').replace('\\', '_')
+                # Imported here so faiss/sentence-transformers only load when the store is used
+                from .vector_store import VectorStore
+                
                 vector_store_path = f"vector_stores/{vector_store_name}"
                 self.vector_store = VectorStore(vector_store_path=vector_store_path)
                 self.vector_store_enabled = True
@@ -49,23 +65,53 @@ class DocumentSearchTool:
         """Index all PDF and Excel documents in the folder"""
         if not os.path.exists(self.folder_path):
             logger.warning(f"Folder path does not exist: {self.folder_path}")
+            if self.vector_store_enabled:
+                self._add_to_vector_store()
             return
         
         try:
-            for filename in os.listdir(self.folder_path):
-                file_path = os.path.join(self.folder_path, filename)
-                content = None
+            # One directory walk supplies names and the stat data kept in the index
+            with os.scandir(self.folder_path) as entries:
+                file_stats = {
+                    entry.name: entry.stat() for entry in entries
+                    if entry.name.lower().endswith(('.pdf', '.xlsx', '.xls')) and entry.is_file()
+                }
+            filenames = list(file_stats)
+            
+            # Reuse text extracted on a previous run for files with the same size and mtime
+            cached_contents = load_extraction_cache(self.content_cache_path, EXTRACTION_VERSION)
+            contents = {}
+            pending = []
+            for filename in filenames:
+                stat = file_stats[filename]
+                cached = cached_contents.get(filename)
+                if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+                    contents[filename] = cached[2]
+                else:
+                    pending.append(filename)
+                    
+            for filename in pending:
+                contents[filename] = self._extract_content(filename)
+                    
+            if pending or set(cached_contents) - set(filenames):
+                save_extraction_cache(self.content_cache_path, EXTRACTION_VERSION, {
+                    filename: (file_stats[filename].st_size, file_stats[filename].st_mtime, contents[filename])
+                    for filename in filenames if contents[filename]
+                })
                 
-                if filename.lower().endswith('.pdf'):
-                    content = self._extract_pdf_content(file_path)
-                elif filename.lower().endswith(('.xlsx', '.xls')):
-                    content = self._extract_excel_content(file_path)
+            for filename in filenames:
+                content = contents[filename]
+                file_path = os.path.join(self.folder_path, filename)
                 
                 if content:
+                    content_lower = content.lower()
                     self.indexed_documents[filename] = {
                         'content': content,
+                        'content_lower': content_lower,
+                        'words': frozenset(TOKEN_PATTERN.findall(content_lower)),
                         'path': file_path,
-                        'size': os.path.getsize(file_path),
+                        'size': file_stats[filename].st_size,
+                        'mtime': file_stats[filename].st_mtime,
                         'type': 'pdf' if filename.lower().endswith('.pdf') else 'excel'
                     }
                     logger.info(f"Indexed document: {filename}")
@@ -81,15 +127,26 @@ class DocumentSearchTool:
         except Exception as e:
             logger.error(f"Error indexing documents: {str(e)}")
     
+    def _extract_content(self, filename: str) -> Optional[str]:
+        """Extract text from a folder file based on its extension"""
+        file_path = os.path.join(self.folder_path, filename)
+        if filename.lower().endswith('.pdf'):
+            return self._extract_pdf_content(file_path)
+        return self._extract_excel_content(file_path)
+        
     def _add_to_vector_store(self) -> None:
         """Add documents to vector store with chunking"""
         try:
             if not self.indexed_documents:
+                # No documents left; drop the chunks of files that no longer exist
+                self.vector_store.clear()
                 return
             
-            # Check if vector store already has documents
-            if self.vector_store.get_stats()["total_documents"] >= len(self.indexed_documents):
-                logger.info("Vector store already contains documents, skipping re-indexing")
+            # Skip re-embedding when the persisted index was built from these same files
+            signature = self._compute_folder_signature()
+            if (self.vector_store.get_stats()["total_documents"] > 0 and
+                    self.vector_store.load_index_meta().get('folder_signature') == signature):
+                logger.info("Vector store is up to date with the documents, skipping re-indexing")
                 return
             
             # Clear existing vector store
@@ -121,23 +178,34 @@ class DocumentSearchTool:
             self.vector_store.add_documents(texts, metadatas)
             logger.info(f"Completed adding chunks to vector store")
             
+            # Only record the signature when every chunk made it into the index
+            if self.vector_store.get_stats()["total_documents"] == len(texts):
+                self.vector_store.save_index_meta({'folder_signature': signature})
+                
         except Exception as e:
             logger.error(f"Error adding documents to vector store: {str(e)}")
             logger.warning("Vector store indexing failed, will use keyword search as fallback")
     
+    def _compute_folder_signature(self) -> str:
+        """Fingerprint the extraction version and the indexed files by name, size and modification time"""
+        # Hash one blob instead of updating the hasher per file
+        signature_data = f"extraction:{EXTRACTION_VERSION}\n" + "".join(
+            f"{filename}:{doc_data['size']}:{doc_data['mtime']}\n"
+            for filename, doc_data in sorted(self.indexed_documents.items())
+        )
+        return hashlib.md5(signature_data.encode()).hexdigest()
+        
     def _extract_pdf_content(self, file_path: str) -> Optional[str]:
         """Extract text content from PDF file"""
         try:
-            content = ""
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    content += page.extract_text() + "\n"
+                # Join page texts once instead of re-copying the growing string per page
+                content = "".join(page.extract_text() + "\n" for page in pdf_reader.pages)
             
             # Clean up the content
-            content = re.sub(r'\s+', ' ', content).strip()
+            content = WHITESPACE_PATTERN.sub(' ', content).strip()
             return content
             
         except Exception as e:
@@ -166,9 +234,14 @@ class DocumentSearchTool:
                     headers = " | ".join(str(col) for col in df.columns)
                     content_parts.append(f"COLUMNAS: {headers}\n")
                     
-                    # Add rows
-                    for index, row in df.iterrows():
-                        row_data = " | ".join(str(val) if pd.notna(val) else "" for val in row)
+                    # Add rows; read the values and missing-value mask as arrays once
+                    # instead of building a Series per row
+                    values = df.to_numpy(dtype=object)
+                    present = df.notna().to_numpy()
+                    for index, row, row_present in zip(df.index, values, present):
+                        row_data = " | ".join(
+                            str(val) if is_present else "" for val, is_present in zip(row, row_present)
+                        )
                         content_parts.append(f"FILA {index + 1}: {row_data}")
                 else:
                     content_parts.append("(Hoja vacía)")
@@ -177,37 +250,71 @@ class DocumentSearchTool:
             content = "\n".join(content_parts)
             
             # Clean up the content
-            content = re.sub(r'\s+', ' ', content).strip()
+            content = WHITESPACE_PATTERN.sub(' ', content).strip()
             return content
             
         except Exception as e:
             logger.error(f"Error extracting Excel content from {file_path}: {str(e)}")
             return None
     
-    def _calculate_relevance_score(self, query: str, content: str) -> float:
-        """Calculate relevance score between query and content"""
-        query_lower = query.lower()
-        content_lower = content.lower()
-        
-        # Direct substring match gets high score
-        if query_lower in content_lower:
-            return 0.9
+    def _compile_scorer(self, query: str, min_score: float = 0.0) -> Callable[..., float]:
+        """
+        Build a relevance scorer specialized for a single query
         
-        # Check for keyword matches
-        query_words = set(query_lower.split())
-        content_words = set(content_lower.split())
+        Everything derived from the query (lowercased text, word set and the
+        fuzzy matcher) is computed once here, so scoring each document only
+        does per-document work.
         
-        if not query_words:
-            return 0.0
+        Args:
+            query: Search query
+            min_score: Scores at or below this value are not needed exactly;
+                documents that cannot beat it skip the fuzzy matcher
+            
+        Returns:
+            Function mapping lowercased document content (and optionally
+            its precomputed word set) to a relevance score
+        """
+        query_lower = query.lower()
+        query_words = set(TOKEN_PATTERN.findall(query_lower))
+        query_word_count = len(query_words)
+        query_length = len(query_lower)
         
-        matches = len(query_words.intersection(content_words))
-        keyword_score = matches / len(query_words)
+        # Reuse one matcher per query; only the document side changes
+        matcher = SequenceMatcher(None, query_lower, "")
         
-        # Use sequence matcher for fuzzy matching
-        similarity_score = SequenceMatcher(None, query_lower, content_lower[:1000]).ratio()
+        def score(content_lower: str, content_words: Optional[frozenset] = None) -> float:
+            # Direct substring match gets high score
+            if query_lower in content_lower:
+                return 0.9
+            
+            if not query_word_count:
+                return 0.0
+            
+            # Check for keyword matches
+            if content_words is None:
+                content_words = TOKEN_PATTERN.findall(content_lower)
+            matches = len(query_words.intersection(content_words))
+            keyword_score = matches / query_word_count * 0.7
+            
+            # The fuzzy ratio can never exceed 2*min(a, b)/(a + b); skip the
+            # matcher when even that bound cannot change the result
+            sample = content_lower[:1000]
+            ratio_bound = 2 * min(query_length, len(sample)) / (query_length + len(sample))
+            if ratio_bound * 0.3 <= max(keyword_score, min_score):
+                return keyword_score
+            
+            # Use sequence matcher for fuzzy matching
+            matcher.set_seq2(sample)
+            similarity_score = matcher.ratio()
+            
+            # Combined score
+            return max(keyword_score, similarity_score * 0.3)
         
-        # Combined score
-        return max(keyword_score * 0.7, similarity_score * 0.3)
+        return score
+    
+    def _calculate_relevance_score(self, query: str, content: str) -> float:
+        """Calculate relevance score between query and content"""
+        return self._compile_scorer(query)(content.lower())
     
     def search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """
@@ -257,7 +364,8 @@ class DocumentSearchTool:
                 if len(results) >= max_results:
                     break
             
-            logger.info(f"Vector search found {len(results)} results for: {query[:50]}...")
+            # Per-query detail: debug level, formatted only if that level is enabled
+            logger.debug("Vector search found %d results for: %.50s...", len(results), query)
             return results
             
         except Exception as e:
@@ -267,50 +375,63 @@ class DocumentSearchTool:
     def _fallback_keyword_search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
         """Fallback to keyword-based search if vector search fails"""
         try:
-            results = []
+            candidates = []
+            min_score = 0.1  # Minimum threshold
+            score_content = self._compile_scorer(query, min_score)
             
             for filename, doc_data in self.indexed_documents.items():
-                content = doc_data['content']
-                
                 # Calculate relevance score
-                score = self._calculate_relevance_score(query, content)
+                score = score_content(doc_data['content_lower'], doc_data['words'])
                 
-                if score > 0.1:  # Minimum threshold
-                    # Extract relevant excerpt
-                    excerpt = self._extract_relevant_excerpt(query, content)
-                    
-                    results.append({
-                        'file': filename,
-                        'score': score,
-                        'content': excerpt,
-                        'path': doc_data['path'],
-                        'size': doc_data['size'],
-                        'vector_score': False
-                    })
-            
-            # Sort by score (descending) and limit results
-            results.sort(key=lambda x: x['score'], reverse=True)
-            return results[:max_results]
+                if score > min_score:
+                    candidates.append((score, filename, doc_data))
+            
+            # Select the top scores (descending) before doing any excerpt
+            # work, which is only needed for the returned documents
+            top_candidates = heapq.nlargest(max_results, candidates, key=lambda x: x[0])
+            
+            results = []
+            for score, filename, doc_data in top_candidates:
+                # Extract relevant excerpt
+                excerpt = self._extract_relevant_excerpt(
+                    query, doc_data['content'], content_lower=doc_data['content_lower']
+                )
+                
+                results.append({
+                    'file': filename,
+                    'score': score,
+                    'content': excerpt,
+                    'path': doc_data['path'],
+                    'size': doc_data['size'],
+                    'vector_score': False
+                })
+            
+            return results
             
         except Exception as e:
             logger.error(f"Error in fallback search: {str(e)}")
             return []
     
-    def _extract_relevant_excerpt(self, query: str, content: str, max_length: int = 500) -> str:
+    def _extract_relevant_excerpt(self, query: str, content: str, max_length: int = 500,
+                                  content_lower: Optional[str] = None) -> str:
         """Extract relevant excerpt from content based on query"""
         query_lower = query.lower()
-        content_lower = content.lower()
+        if content_lower is None:
+            content_lower = content.lower()
         
         # Find the best match position
         best_pos = content_lower.find(query_lower)
         
         if best_pos == -1:
-            # If no direct match, find best keyword match
-            query_words = query_lower.split()
+            # If no direct match, find best keyword match. Words that do not
+            # occur anywhere in the document cannot occur in any window, so
+            # only the remaining ones are counted (and none means no scan)
+            query_words = [word for word in query_lower.split() if word in content_lower]
             best_pos = 0
             best_score = 0
+            scan_end = len(content_lower) - 100 if query_words else 0
             
-            for i in range(0, len(content_lower) - 100, 50):
+            for i in range(0, scan_end, 50):
                 excerpt = content_lower[i:i + 200]
                 score = sum(1 for word in query_words if word in excerpt)
                 if score > best_score:
@@ -334,8 +455,7 @@ class DocumentSearchTool:
     def refresh_index(self) -> None:
         """Refresh the document index and vector store"""
         self.indexed_documents.clear()
-        if self.vector_store_enabled and self.vector_store:
-            self.vector_store.clear()
+        # The vector store is rebuilt by indexing only if the folder signature changed
         self.index_documents()
         logger.info("Document index refreshed")
     
@@ -8,11 +8,21 @@ import logging
 import PyPDF2
 import pandas as pd
 import re
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from difflib import SequenceMatcher
 
 logger = logging.getLogger(__name__)
 
+WORD_PATTERN = re.compile(r'\w+')
+
+# Function words ignored when matching query words against company names
+STOP_WORDS = frozenset({
+    'que', 'qué', 'cual', 'cuál', 'cuales', 'cuáles', 'los', 'las', 'del', 'por',
+    'para', 'con', 'sin', 'una', 'uno', 'unos', 'unas', 'sus', 'son', 'hay',
+    'está', 'están', 'esta', 'este', 'estos', 'estas', 'the', 'and', 'for',
+    'with', 'are', 'which', 'what'
+})
+
 class ExhibitorQueryTool:
     def __init__(self, folder_path: str):
         """
@@ -23,40 +33,56 @@ class ExhibitorQueryTool:
         """
         self.folder_path = folder_path
         self.indexed_data = {}
-        self.company_patterns = [
+        self.all_companies = []  # Flattened across documents, rebuilt on indexing
+        self.exhibitor_stats = {}
+        # Compiled once; every indexed line is matched against these
+        self.company_patterns = [re.compile(pattern) for pattern in [
             r'\b[A-Z][a-zA-Z\s&\.,]+(?:S\.A\.|S\.L\.|Inc\.|Corp\.|Ltd\.|LLC|Co\.)\b',
             r'\b[A-Z][a-zA-Z\s&\.,]{2,30}\b(?=\s*[-–]\s*(?:Stand|Booth|Pabellón))',
             r'(?:Empresa|Company|Exhibitor):\s*([A-Z][a-zA-Z\s&\.,]+)',
             r'\b[A-Z][A-Z\s&]+\b(?=\s*Stand)',
-        ]
-        self.stand_patterns = [
+        ]]
+        self.stand_patterns = [re.compile(pattern) for pattern in [
             r'(?:Stand|Booth|Pabellón)\s*:?\s*([A-Z]?\d+[A-Z]?)',
             r'(?:Stand|Booth|Pabellón)\s+([A-Z]?\d+[A-Z]?)',
             r'(\d+[A-Z]?)\s*(?:Stand|Booth)',
-        ]
+        ]]
+        
+        # Query words that select a result filter, matched as whole words
+        self.list_all_keywords = frozenset({
+            'todos', 'todas', 'all', 'lista', 'listas', 'listado', 'listados', 'listar',
+            'completa', 'completas', 'completo', 'completos'
+        })
+        self.stand_keywords = frozenset({
+            'stand', 'stands', 'pabellón', 'pabellon', 'pabellones', 'booth', 'booths'
+        })
         self.index_documents()
     
     def index_documents(self) -> None:
         """Index all exhibitor documents (PDF and Excel)"""
+        # Reset the derived views first so a failed pass never serves the previous index
+        self.all_companies = []
+        self.exhibitor_stats = {}
+        
         if not os.path.exists(self.folder_path):
             logger.warning(f"Exhibitor folder does not exist: {self.folder_path}")
             return
         
         try:
-            for filename in os.listdir(self.folder_path):
+            filenames = [
+                filename for filename in os.listdir(self.folder_path)
+                if filename.lower().endswith(('.pdf', '.xlsx', '.xls'))
+            ]
+            
+            for filename in filenames:
+                content, companies = self._extract_file(filename)
                 file_path = os.path.join(self.folder_path, filename)
-                content = None
-                companies = []
-                
-                if filename.lower().endswith('.pdf'):
-                    content = self._extract_pdf_content(file_path)
-                    if content:
-                        companies = self._extract_companies_from_text(content)
-                elif filename.lower().endswith(('.xlsx', '.xls')):
-                    content = self._extract_excel_content(file_path)
-                    companies = self._extract_companies_from_excel(file_path)
                 
                 if content or companies:
+                    # Attach the source once here instead of on every query
+                    for company in companies:
+                        company['source_file'] = filename
+                        
                     self.indexed_data[filename] = {
                         'content': content or '',
                         'companies': companies,
@@ -65,21 +91,48 @@ class ExhibitorQueryTool:
                     }
                     logger.info(f"Indexed exhibitor document: {filename} with {len(companies)} companies")
             
+            # Company list and stats only change when documents are re-indexed
+            self.all_companies = [
+                company for doc_data in self.indexed_data.values()
+                for company in doc_data['companies']
+            ]
+            self.exhibitor_stats = self._generate_exhibitor_stats(self.all_companies)
+            
             logger.info(f"Indexed {len(self.indexed_data)} exhibitor documents")
             
         except Exception as e:
             logger.error(f"Error indexing exhibitor documents: {str(e)}")
     
+    def _extract_file(self, filename: str) -> Tuple[Optional[str], List[Dict[str, Any]]]:
+        """Extract text content and companies from a single folder file"""
+        file_path = os.path.join(self.folder_path, filename)
+        content = None
+        companies = []
+        
+        if filename.lower().endswith('.pdf'):
+            content = self._extract_pdf_content(file_path)
+            if content:
+                companies = self._extract_companies_from_text(content)
+        else:
+            # Parse the workbook once for both the text and the company columns
+            try:
+                df_dict = self._read_excel(file_path)
+            except Exception as e:
+                logger.error(f"Error reading Excel file {file_path}: {str(e)}")
+                return None, []
+            content = self._extract_excel_content(file_path, df_dict)
+            companies = self._extract_companies_from_excel(file_path, df_dict)
+            
+        return content, companies
+    
     def _extract_pdf_content(self, file_path: str) -> Optional[str]:
         """Extract text content from PDF file"""
         try:
-            content = ""
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    content += page.extract_text() + "\n"
+                # Join page texts once instead of re-copying the growing string per page
+                content = "".join(page.extract_text() + "\n" for page in pdf_reader.pages)
             
             return content
             
@@ -87,13 +140,18 @@ class ExhibitorQueryTool:
             logger.error(f"Error extracting PDF content from {file_path}: {str(e)}")
             return None
     
-    def _extract_excel_content(self, file_path: str) -> Optional[str]:
-        """Extract text content from Excel file"""
+    def _read_excel(self, file_path: str) -> Dict[str, pd.DataFrame]:
+        """Read every sheet of an Excel file with the engine matching its extension"""
+        if file_path.lower().endswith('.xlsx'):
+            return pd.read_excel(file_path, sheet_name=None, engine='openpyxl')
+        return pd.read_excel(file_path, sheet_name=None, engine='xlrd')
+    
+    def _extract_excel_content(self, file_path: str,
+                               df_dict: Optional[Dict[str, pd.DataFrame]] = None) -> Optional[str]:
+        """Extract text content from Excel file (or from its already-read sheets)"""
         try:
-            if file_path.lower().endswith('.xlsx'):
-                df_dict = pd.read_excel(file_path, sheet_name=None, engine='openpyxl')
-            else:
-                df_dict = pd.read_excel(file_path, sheet_name=None, engine='xlrd')
+            if df_dict is None:
+                df_dict = self._read_excel(file_path)
             
             content_parts = []
             for sheet_name, df in df_dict.items():
@@ -106,14 +164,13 @@ class ExhibitorQueryTool:
             logger.error(f"Error extracting Excel content from {file_path}: {str(e)}")
             return None
     
-    def _extract_companies_from_excel(self, file_path: str) -> List[Dict[str, Any]]:
-        """Extract companies directly from Excel structure"""
+    def _extract_companies_from_excel(self, file_path: str,
+                                      df_dict: Optional[Dict[str, pd.DataFrame]] = None) -> List[Dict[str, Any]]:
+        """Extract companies directly from Excel structure (or from its already-read sheets)"""
         companies = []
         try:
-            if file_path.lower().endswith('.xlsx'):
-                df_dict = pd.read_excel(file_path, sheet_name=None, engine='openpyxl')
-            else:
-                df_dict = pd.read_excel(file_path, sheet_name=None, engine='xlrd')
+            if df_dict is None:
+                df_dict = self._read_excel(file_path)
             
             for sheet_name, df in df_dict.items():
                 if df.empty:
@@ -123,37 +180,42 @@ class ExhibitorQueryTool:
                 company_columns = []
                 stand_columns = []
                 
-                for col in df.columns:
+                for position, col in enumerate(df.columns):
                     col_str = str(col).lower()
                     if any(keyword in col_str for keyword in ['empresa', 'company', 'expositor', 'exhibitor', 'nombre']):
-                        company_columns.append(col)
+                        company_columns.append(position)
                     elif any(keyword in col_str for keyword in ['stand', 'booth', 'pabellón']):
-                        stand_columns.append(col)
+                        stand_columns.append(position)
+                        
+                # Read cell values and the missing-value mask once per sheet;
+                # each cell is then looked up and stringified a single time
+                values = df.to_numpy(dtype=object)
+                present = df.notna().to_numpy()
                 
                 # Extract companies from identified columns
-                for _, row in df.iterrows():
+                for index, row, row_present in zip(df.index, values, present):
+                    # The stand is per row, shared by every company column
+                    stand = ""
+                    for stand_col in stand_columns:
+                        if row_present[stand_col]:
+                            stand = str(row[stand_col])
+                            break
+                            
                     for company_col in company_columns:
-                        company_name = str(row[company_col]) if pd.notna(row[company_col]) else ""
+                        company_name = str(row[company_col]) if row_present[company_col] else ""
                         if company_name and company_name != "nan" and len(company_name) > 2:
-                            # Look for corresponding stand
-                            stand = ""
-                            for stand_col in stand_columns:
-                                if pd.notna(row[stand_col]):
-                                    stand = str(row[stand_col])
-                                    break
-                            
                             companies.append({
                                 'name': company_name.strip(),
                                 'stand': stand.strip() if stand else None,
                                 'source_sheet': sheet_name,
-                                'line': f"Sheet: {sheet_name}, Row: {row.name + 1}"
+                                'line': f"Sheet: {sheet_name}, Row: {index + 1}"
                             })
                 
                 # If no specific columns found, try text extraction from all cells
                 if not company_columns:
-                    for _, row in df.iterrows():
-                        for col in df.columns:
-                            cell_value = str(row[col]) if pd.notna(row[col]) else ""
+                    for row, row_present in zip(values, present):
+                        for cell, cell_present in zip(row, row_present):
+                            cell_value = str(cell) if cell_present else ""
                             if cell_value and len(cell_value) > 3:
                                 # Try to extract companies from cell text
                                 text_companies = self._extract_companies_from_text(cell_value)
@@ -185,7 +247,7 @@ class ExhibitorQueryTool:
                 
                 # Look for company patterns
                 for pattern in self.company_patterns:
-                    match = re.search(pattern, line)
+                    match = pattern.search(line)
                     if match:
                         company_name = match.group(1) if match.groups() else match.group(0)
                         company_name = company_name.strip()
@@ -195,7 +257,7 @@ class ExhibitorQueryTool:
                 
                 # Look for stand patterns in the same line
                 for pattern in self.stand_patterns:
-                    match = re.search(pattern, line)
+                    match = pattern.search(line)
                     if match:
                         stand_match = match.group(1).strip()
                         break
@@ -263,37 +325,35 @@ class ExhibitorQueryTool:
         
         try:
             query_lower = query.lower()
-            all_companies = []
-            
-            # Collect all companies from indexed documents
-            for filename, doc_data in self.indexed_data.items():
-                companies = doc_data.get('companies', [])
-                for company in companies:
-                    company['source_file'] = filename
-                    all_companies.append(company)
+            query_words = set(WORD_PATTERN.findall(query_lower))
+            all_companies = self.all_companies
             
             # Filter companies based on query
-            if any(keyword in query_lower for keyword in ['todos', 'all', 'lista', 'completa']):
+            if not self.list_all_keywords.isdisjoint(query_words):
                 # Return all companies
-                result["companies"] = all_companies
-            elif any(keyword in query_lower for keyword in ['stand', 'pabellón', 'booth']):
+                result["companies"] = list(all_companies)
+            elif not self.stand_keywords.isdisjoint(query_words):
                 # Filter companies with stand information
                 result["companies"] = [c for c in all_companies if c.get('stand')]
             else:
                 # Search by company name or general terms
+                search_words = list(dict.fromkeys(
+                    word for word in WORD_PATTERN.findall(query_lower)
+                    if len(word) > 2 and word not in STOP_WORDS
+                ))
                 matching_companies = []
                 for company in all_companies:
                     company_name_lower = company['name'].lower()
                     
                     # Check if query matches company name
                     if (query_lower in company_name_lower or 
-                        any(word in company_name_lower for word in query_lower.split() if len(word) > 2)):
+                        any(word in company_name_lower for word in search_words)):
                         matching_companies.append(company)
                 
                 result["companies"] = matching_companies if matching_companies else all_companies[:20]
             
-            # Generate statistics
-            result["stats"] = self._generate_exhibitor_stats(all_companies)
+            # Statistics are precomputed at index time
+            result["stats"] = dict(self.exhibitor_stats)
             
             return result
             
@@ -331,11 +391,8 @@ class ExhibitorQueryTool:
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get tool statistics"""
-        total_companies = sum(len(doc_data.get('companies', [])) 
-                            for doc_data in self.indexed_data.values())
-        
         return {
             "documents_processed": len(self.indexed_data),
-            "total_companies": total_companies,
+            "total_companies": len(self.all_companies),
             "folder_path": self.folder_path
         }
\ No newline at end of file
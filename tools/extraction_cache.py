@@ -0,0 +1,54 @@
+"""
+Extraction Cache for Food Service 2025
+Persists per-file extraction results across restarts, keyed by file size and mtime
+"""
+
+import os
+import pickle
+import logging
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+def load_extraction_cache(cache_path: str, version: int) -> Dict[str, tuple]:
+    """
+    Load cached extractions as {filename: (size, mtime, result)}
+    
+    Args:
+        cache_path: Pickle file holding the cache
+        version: Extraction version of the calling tool; a cache written by
+            any other version (or in the unversioned format) is ignored
+    
+    Returns:
+        Cached entries, or an empty dict when missing, stale or unreadable
+    """
+    try:
+        if os.path.exists(cache_path):
+            with open(cache_path, 'rb') as f:
+                cache = pickle.load(f)
+            if isinstance(cache, dict) and cache.get('version') == version:
+                return cache['files']
+            logger.info(f"Extraction cache {cache_path} is from another extraction version, ignoring it")
+    except Exception as e:
+        logger.error(f"Error loading extraction cache {cache_path}: {str(e)}")
+    return {}
+
+
+def save_extraction_cache(cache_path: str, version: int, files: Dict[str, tuple]) -> None:
+    """
+    Save cached extractions, swapping the file in atomically
+    
+    Args:
+        cache_path: Pickle file holding the cache
+        version: Extraction version the entries were produced with
+        files: Entries as {filename: (size, mtime, result)}
+    """
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'version': version, 'files': files}, f)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.error(f"Error saving extraction cache {cache_path}: {str(e)}")
@@ -4,27 +4,35 @@ Implements FAISS-based vector storage with sentence transformers
 """
 
 import os
+import json
 import pickle
 import logging
+import threading
+from collections import OrderedDict
 import numpy as np
 import faiss
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any
 from sentence_transformers import SentenceTransformer
-import hashlib
 
 logger = logging.getLogger(__name__)
 
 class VectorStore:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", vector_store_path: str = "vector_stores"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", vector_store_path: str = "vector_stores",
+                 batch_size: int = 256):
         """
         Initialize vector store with sentence transformer model
         
         Args:
             model_name: Sentence transformer model name
             vector_store_path: Path to store vector indices
+            batch_size: Number of texts embedded per encode call
         """
         self.model_name = model_name
         self.vector_store_path = vector_store_path
+        self.batch_size = batch_size
+        self.query_cache_size = 1024  # Query embeddings kept in the LRU cache
+        self._query_embeddings = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
         self.model = None
         self.index = None
         self.documents = []
@@ -83,8 +91,9 @@ class VectorStore:
         try:
             logger.info(f"Adding {len(texts)} documents to vector store in batches...")
             
-            # Process in batches to avoid memory issues
-            batch_size = 50  # Process 50 chunks at a time
+            # Process in batches to avoid memory issues; encode keeps its own
+            # smaller internal batch, which bounds peak activation memory
+            batch_size = self.batch_size
             total_processed = 0
             
             for i in range(0, len(texts), batch_size):
@@ -94,10 +103,11 @@ class VectorStore:
                 try:
                     # Generate embeddings for batch
                     logger.info(f"Processing batch {i//batch_size + 1}/{(len(texts)-1)//batch_size + 1} ({len(batch_texts)} items)")
-                    embeddings = self.model.encode(batch_texts, normalize_embeddings=True, show_progress_bar=False)
+                    embeddings = self.model.encode(batch_texts, normalize_embeddings=True,
+                                                   show_progress_bar=False)
                     
-                    # Add to FAISS index
-                    self.index.add(embeddings.astype('float32'))
+                    # Add to FAISS index (encode already returns float32, so no copy)
+                    self.index.add(embeddings.astype('float32', copy=False))
                     
                     # Store documents and metadata
                     self.documents.extend(batch_texts)
@@ -139,10 +149,10 @@ class VectorStore:
         
         try:
             # Generate query embedding
-            query_embedding = self.model.encode([query], normalize_embeddings=True)
+            query_embedding = self._encode_query(query)
             
             # Search in FAISS index
-            scores, indices = self.index.search(query_embedding.astype('float32'), k)
+            scores, indices = self.index.search(query_embedding, k)
             
             results = []
             for score, idx in zip(scores[0], indices[0]):
@@ -154,13 +164,38 @@ class VectorStore:
                         'index': int(idx)
                     })
             
-            logger.info(f"Found {len(results)} results for query: {query[:50]}...")
+            logger.debug("Found %d results for query: %.50s...", len(results), query)
             return results
             
         except Exception as e:
             logger.error(f"Error searching vector store: {str(e)}")
             return []
     
+    def _encode_query(self, query: str) -> np.ndarray:
+        """
+        Embed a query, reusing the embedding of recently seen identical queries
+        
+        Args:
+            query: Search query
+            
+        Returns:
+            Normalized float32 embedding with shape (1, dimension)
+        """
+        with self._query_embeddings_lock:
+            embedding = self._query_embeddings.get(query)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(query)
+                return embedding
+                
+        embedding = self.model.encode([query], normalize_embeddings=True).astype('float32', copy=False)
+        
+        with self._query_embeddings_lock:
+            self._query_embeddings[query] = embedding
+            if len(self._query_embeddings) > self.query_cache_size:
+                self._query_embeddings.popitem(last=False)
+                
+        return embedding
+        
     def _save_to_disk(self) -> None:
         """Save vector store to disk"""
         try:
@@ -182,6 +217,36 @@ class VectorStore:
             logger.error(f"Error saving vector store: {str(e)}")
             raise
     
+    def load_index_meta(self) -> Dict[str, Any]:
+        """Load the metadata saved alongside the index (empty if missing)"""
+        meta_path = os.path.join(self.vector_store_path, "index_meta.json")
+        try:
+            if os.path.exists(meta_path):
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading index metadata: {str(e)}")
+        return {}
+        
+    def save_index_meta(self, meta: Dict[str, Any]) -> None:
+        """
+        Save metadata alongside the index
+        
+        Written to a temporary file and swapped in, so a crash mid-write
+        never leaves a truncated file behind.
+        
+        Args:
+            meta: JSON-serializable metadata (e.g. the source folder signature)
+        """
+        meta_path = os.path.join(self.vector_store_path, "index_meta.json")
+        tmp_path = f"{meta_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, meta_path)
+        except Exception as e:
+            logger.error(f"Error saving index metadata: {str(e)}")
+            
     def clear(self) -> None:
         """Clear all documents from vector store"""
         try:
@@ -193,6 +258,12 @@ class VectorStore:
             self.documents = []
             self.metadatas = []
             
+            # The saved metadata describes the old index; drop it so an interrupted
+            # rebuild is never mistaken for an up-to-date one
+            meta_path = os.path.join(self.vector_store_path, "index_meta.json")
+            if os.path.exists(meta_path):
+                os.remove(meta_path)
+                
             # Save empty state
             self._save_to_disk()
             
@@ -249,6 +320,12 @@ class VectorStore:
             if chunk:
                 chunks.append(chunk)
             
-            start = end - overlap if end < len(text) else end
+            if end >= len(text):
+                break
+                
+            # Overlap with the previous chunk, but always move forward: a boundary
+            # found within `overlap` of the start would otherwise step back to
+            # the same boundary forever
+            start = end - overlap if end - overlap > start else end
         
         return chunks
\ No newline at end of file
@@ -5,14 +5,19 @@ Specialized tool for extracting visitor information and statistics from document
 
 import os
 import logging
+import threading
 import PyPDF2
 import pandas as pd
 import re
-from typing import List, Dict, Any, Optional
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from .extraction_cache import load_extraction_cache, save_extraction_cache
 
 logger = logging.getLogger(__name__)
 
+# Bump when visitor extraction changes so figures cached by an older
+# version are parsed again
+EXTRACTION_VERSION = 3
+
 class VisitorQueryTool:
     def __init__(self, folder_path: str):
         """
@@ -23,30 +28,91 @@ class VisitorQueryTool:
         """
         self.folder_path = folder_path
         self.indexed_data = {}
+        self.visitor_summary = self._aggregate_visitor_data()  # Rebuilt on indexing
+        
+        cache_name = folder_path.replace('/', '_').replace('\\', '_')
+        # Parsed figures per file, reused across restarts while the file is unchanged
+        self.extraction_cache_path = os.path.join("vector_stores", cache_name, "extracted_visitor_data.pkl")
         
-        # Patterns for extracting visitor data
-        self.visitor_number_patterns = [
+        # Patterns for extracting visitor data, compiled once and reused for every document line
+        self.visitor_number_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in [
             r'(?:visitantes?|visitors?|asistentes?)\s*:?\s*(\d{1,6})',
             r'(\d{1,6})\s*(?:visitantes?|visitors?|asistentes?)',
             r'(?:total|total de)\s*(?:visitantes?|visitors?)\s*:?\s*(\d{1,6})',
             r'(?:attendance|asistencia)\s*:?\s*(\d{1,6})',
-        ]
+        ]]
         
-        self.daily_patterns = [
-            r'(?:día|day)\s*(\d{1,2})\s*:?\s*(\d{1,6})\s*(?:visitantes?|visitors?)',
-            r'(\d{1,2})/(\d{1,2})/(\d{4})\s*:?\s*(\d{1,6})',
-            r'(?:lunes|martes|miércoles|jueves|viernes|sábado|domingo)\s*:?\s*(\d{1,6})',
-        ]
+        # Daily and demographic figures, fused into one alternation so a document
+        # is scanned once; the outer group name tells which figure matched.
+        # Spacing never crosses a newline, so every match stays on one line.
+        space = r'[^\S\n]*'
+        daily_patterns = {
+            'day': rf'(?:día|day){space}(?P<day_number>\d{{1,2}}){space}:?{space}(?P<day_visitors>\d{{1,6}}){space}(?:visitantes?|visitors?)',
+            'date': rf'(?P<date_day>\d{{1,2}})/(?P<date_month>\d{{1,2}})/(?P<date_year>\d{{4}}){space}:?{space}(?P<date_visitors>\d{{1,6}})',
+            # A weekday followed by a date is left to the date figure
+            'weekday': rf'(?P<weekday_name>lunes|martes|miércoles|jueves|viernes|sábado|domingo){space}:?{space}(?P<weekday_visitors>\d{{1,6}})(?![\d/])',
+        }
+        demographic_patterns = {
+            'men': rf'(?:hombres?|men|male){space}:?{space}(?P<men_value>\d{{1,6}}|\d{{1,3}}%)',
+            'women': rf'(?:mujeres?|women|female){space}:?{space}(?P<women_value>\d{{1,6}}|\d{{1,3}}%)',
+            'age': rf'(?:edad|age){space}(?:promedio|average){space}:?{space}(?P<age_value>\d{{1,3}})',
+            'professionals': rf'(?:profesionales?|professionals?){space}:?{space}(?P<professionals_value>\d{{1,6}}|\d{{1,3}}%)',
+            'students': rf'(?:estudiantes?|students?){space}:?{space}(?P<students_value>\d{{1,6}}|\d{{1,3}}%)',
+        }
+        self.figure_pattern = re.compile('|'.join(
+            f'(?P<{name}>{pattern})'
+            for name, pattern in {**daily_patterns, **demographic_patterns}.items()
+        ), re.IGNORECASE)
+        self.demographic_labels = {
+            'men': 'Hombres',
+            'women': 'Mujeres',
+            'age': 'Edad promedio',
+            'professionals': 'Profesionales',
+            'students': 'Estudiantes',
+        }
         
-        self.demographic_patterns = [
-            r'(?:hombres?|men|male)\s*:?\s*(\d{1,6}|\d{1,3}%)',
-            r'(?:mujeres?|women|female)\s*:?\s*(\d{1,6}|\d{1,3}%)',
-            r'(?:edad|age)\s*(?:promedio|average)\s*:?\s*(\d{1,3})',
-            r'(?:profesionales?|professionals?)\s*:?\s*(\d{1,6}|\d{1,3}%)',
-            r'(?:estudiantes?|students?)\s*:?\s*(\d{1,6}|\d{1,3}%)',
+        # Trend lines: any trend keyword plus at least one digit
+        trend_keywords = [
+            'aumento', 'increase', 'incremento', 'crecimiento', 'growth',
+            'disminución', 'decrease', 'reducción', 'decline',
+            'pico', 'peak', 'máximo', 'maximum',
+            'tendencia', 'trend', 'patrón', 'pattern'
         ]
+        self.trend_pattern = re.compile(
+            '|'.join(re.escape(keyword) for keyword in trend_keywords), re.IGNORECASE
+        )
+        self.digit_pattern = re.compile(r'\d')
+        
+        # Query keywords per requested section; 'specific' marks a query that
+        # asks for one section rather than the whole summary
+        self.query_keywords = {
+            'total': ['total', 'cuantos', 'cantidad'],
+            'daily': ['día', 'day', 'diario', 'daily'],
+            'demographics': ['demografía', 'demographics', 'perfil'],
+            'trends': ['tendencia', 'trend', 'patrón'],
+            'specific': ['total', 'día', 'demografía', 'tendencia'],
+        }
+        self.keyword_sections = {}
+        for section, keywords in self.query_keywords.items():
+            for keyword in keywords:
+                self.keyword_sections.setdefault(keyword, set()).add(section)
+        # Lookahead lets overlapping keywords all be reported
+        self.query_keyword_pattern = re.compile(
+            '(?=(' + '|'.join(re.escape(keyword) for keyword in self.keyword_sections) + '))'
+        )
         
-        self.index_documents()
+        # Documents are parsed on first use rather than at construction
+        self._indexed = False
+        self._index_lock = threading.Lock()
+    
+    def _ensure_indexed(self) -> None:
+        """Index the visitor documents once, the first time they are needed"""
+        if self._indexed:
+            return
+        with self._index_lock:
+            if not self._indexed:
+                self.index_documents()
+                self._indexed = True
     
     def index_documents(self) -> None:
         """Index all visitor documents (PDF and Excel)"""
@@ -55,20 +121,43 @@ class VisitorQueryTool:
             return
         
         try:
-            for filename in os.listdir(self.folder_path):
-                file_path = os.path.join(self.folder_path, filename)
-                content = None
-                visitor_data = {}
+            # One directory walk; scandir entries carry the stat used for cache keys
+            with os.scandir(self.folder_path) as entries:
+                file_stats = {
+                    entry.name: entry.stat() for entry in entries
+                    if entry.name.lower().endswith(('.pdf', '.xlsx', '.xls')) and entry.is_file()
+                }
+            filenames = list(file_stats)
+            
+            # Reuse figures parsed on a previous run for files with the same size and mtime
+            cached_extractions = load_extraction_cache(self.extraction_cache_path, EXTRACTION_VERSION)
+            extracted = {}
+            pending = []
+            for filename in filenames:
+                stat = file_stats[filename]
+                cached = cached_extractions.get(filename)
+                if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime:
+                    extracted[filename] = cached[2]
+                else:
+                    pending.append(filename)
+                    
+            for filename in pending:
+                extracted[filename] = self._extract_file(filename)
+                    
+            if pending or set(cached_extractions) - set(filenames):
+                save_extraction_cache(self.extraction_cache_path, EXTRACTION_VERSION, {
+                    filename: (file_stats[filename].st_size, file_stats[filename].st_mtime, extracted[filename])
+                    for filename in filenames if extracted[filename][0] or extracted[filename][1]
+                })
                 
-                if filename.lower().endswith('.pdf'):
-                    content = self._extract_pdf_content(file_path)
-                    if content:
-                        visitor_data = self._extract_visitor_data_from_text(content)
-                elif filename.lower().endswith(('.xlsx', '.xls')):
-                    content = self._extract_excel_content(file_path)
-                    visitor_data = self._extract_visitor_data_from_excel(file_path)
+            for filename in filenames:
+                content, visitor_data = extracted[filename]
+                file_path = os.path.join(self.folder_path, filename)
                 
                 if content or visitor_data:
+                    # Attach the source once here instead of on every query
+                    visitor_data['source_file'] = filename
+                    
                     self.indexed_data[filename] = {
                         'content': content or '',
                         'visitor_data': visitor_data,
@@ -77,21 +166,70 @@ class VisitorQueryTool:
                     }
                     logger.info(f"Indexed visitor document: {filename}")
             
+            # Figures across documents only change when documents are re-indexed
+            self.visitor_summary = self._aggregate_visitor_data()
+            
             logger.info(f"Indexed {len(self.indexed_data)} visitor documents")
             
         except Exception as e:
             logger.error(f"Error indexing visitor documents: {str(e)}")
     
+    def _extract_file(self, filename: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        """Extract text content and visitor figures from a single folder file"""
+        file_path = os.path.join(self.folder_path, filename)
+        content = None
+        visitor_data = {}
+        
+        if filename.lower().endswith('.pdf'):
+            content = self._extract_pdf_content(file_path)
+            if content:
+                visitor_data = self._extract_visitor_data_from_text(content)
+        else:
+            # Parse the workbook once for both the text and the visitor columns
+            try:
+                df_dict = self._read_excel(file_path)
+            except Exception as e:
+                logger.error(f"Error reading Excel file {file_path}: {str(e)}")
+                df_dict = {}
+            content = self._extract_excel_content(file_path, df_dict)
+            visitor_data = self._extract_visitor_data_from_excel(file_path, df_dict)
+            
+        return content, visitor_data
+    
+    def _aggregate_visitor_data(self) -> Dict[str, Any]:
+        """Merge the figures of every indexed document into one summary"""
+        summary = {
+            "total_visitors": None,
+            "daily_stats": {},
+            "demographics": {},
+            "trends": []
+        }
+        
+        for doc_data in self.indexed_data.values():
+            data = doc_data.get('visitor_data', {})
+            total = data.get('total_visitors')
+            if total and (summary["total_visitors"] is None or total > summary["total_visitors"]):
+                summary["total_visitors"] = total  # Take the highest total
+            summary["daily_stats"].update(data.get('daily_stats', {}))
+            summary["demographics"].update(data.get('demographics', {}))
+            
+            # Keep the first five distinct trends, in document order
+            for trend in data.get('trends', []):
+                if len(summary["trends"]) >= 5:
+                    break
+                if trend not in summary["trends"]:
+                    summary["trends"].append(trend)
+            
+        return summary
+    
     def _extract_pdf_content(self, file_path: str) -> Optional[str]:
         """Extract text content from PDF file"""
         try:
-            content = ""
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 
-                for page_num in range(len(pdf_reader.pages)):
-                    page = pdf_reader.pages[page_num]
-                    content += page.extract_text() + "\n"
+                # Join page texts once instead of re-copying the growing string per page
+                content = "".join(page.extract_text() + "\n" for page in pdf_reader.pages)
             
             return content
             
@@ -99,13 +237,18 @@ class VisitorQueryTool:
             logger.error(f"Error extracting PDF content from {file_path}: {str(e)}")
             return None
     
-    def _extract_excel_content(self, file_path: str) -> Optional[str]:
-        """Extract text content from Excel file"""
+    def _read_excel(self, file_path: str) -> Dict[str, pd.DataFrame]:
+        """Read every sheet of an Excel file with the engine matching its extension"""
+        if file_path.lower().endswith('.xlsx'):
+            return pd.read_excel(file_path, sheet_name=None, engine='openpyxl')
+        return pd.read_excel(file_path, sheet_name=None, engine='xlrd')
+    
+    def _extract_excel_content(self, file_path: str,
+                               df_dict: Optional[Dict[str, pd.DataFrame]] = None) -> Optional[str]:
+        """Extract text content from Excel file (or from its already-read sheets)"""
         try:
-            if file_path.lower().endswith('.xlsx'):
-                df_dict = pd.read_excel(file_path, sheet_name=None, engine='openpyxl')
-            else:
-                df_dict = pd.read_excel(file_path, sheet_name=None, engine='xlrd')
+            if df_dict is None:
+                df_dict = self._read_excel(file_path)
             
             content_parts = []
             for sheet_name, df in df_dict.items():
@@ -118,8 +261,9 @@ class VisitorQueryTool:
             logger.error(f"Error extracting Excel content from {file_path}: {str(e)}")
             return None
     
-    def _extract_visitor_data_from_excel(self, file_path: str) -> Dict[str, Any]:
-        """Extract visitor data directly from Excel structure"""
+    def _extract_visitor_data_from_excel(self, file_path: str,
+                                         df_dict: Optional[Dict[str, pd.DataFrame]] = None) -> Dict[str, Any]:
+        """Extract visitor data directly from Excel structure (or from its already-read sheets)"""
         visitor_data = {
             "total_visitors": None,
             "daily_stats": {},
@@ -128,56 +272,61 @@ class VisitorQueryTool:
         }
         
         try:
-            if file_path.lower().endswith('.xlsx'):
-                df_dict = pd.read_excel(file_path, sheet_name=None, engine='openpyxl')
-            else:
-                df_dict = pd.read_excel(file_path, sheet_name=None, engine='xlrd')
+            if df_dict is None:
+                df_dict = self._read_excel(file_path)
             
             for sheet_name, df in df_dict.items():
                 if df.empty:
                     continue
                 
-                # Look for visitor-related columns
-                for col in df.columns:
+                # Look for visitor-related columns; columns are read whole by
+                # position instead of building a Series per row
+                for position, col in enumerate(df.columns):
                     col_str = str(col).lower()
+                    column = df.iloc[:, position]
                     
                     # Total visitors
                     if any(keyword in col_str for keyword in ['total', 'visitantes', 'visitors', 'asistentes']):
-                        for _, row in df.iterrows():
-                            value = row[col]
-                            if pd.notna(value) and str(value).isdigit():
-                                visitor_count = int(value)
-                                if visitor_count > (visitor_data["total_visitors"] or 0):
-                                    visitor_data["total_visitors"] = visitor_count
+                        counts = self._to_counts(column)
+                        counts = counts[counts % 1 == 0]  # Totals are whole numbers
+                        if not counts.empty:
+                            visitor_count = int(counts.max())
+                            if visitor_count > (visitor_data["total_visitors"] or 0):
+                                visitor_data["total_visitors"] = visitor_count
                     
                     # Daily stats
                     elif any(keyword in col_str for keyword in ['día', 'day', 'fecha', 'date']):
                         # Look for corresponding visitor count column
-                        for other_col in df.columns:
+                        for other_position, other_col in enumerate(df.columns):
                             other_col_str = str(other_col).lower()
                             if any(keyword in other_col_str for keyword in ['visitantes', 'visitors', 'cantidad', 'count']):
-                                for _, row in df.iterrows():
-                                    day_value = row[col]
-                                    count_value = row[other_col]
-                                    if pd.notna(day_value) and pd.notna(count_value):
-                                        day_str = str(day_value)
-                                        if str(count_value).replace('.', '').isdigit():
-                                            visitor_data["daily_stats"][day_str] = int(float(count_value))
+                                counts = self._to_counts(df.iloc[:, other_position])
+                                mask = (column.notna() & counts.notna()).to_numpy()
+                                for day_value, count_value in zip(column[mask].tolist(), counts[mask].tolist()):
+                                    visitor_data["daily_stats"][str(day_value)] = int(count_value)
                                 break
                     
                     # Demographics
                     elif any(keyword in col_str for keyword in ['hombres', 'men', 'male', 'mujeres', 'women', 'female']):
-                        for _, row in df.iterrows():
-                            value = row[col]
-                            if pd.notna(value):
-                                if 'hombres' in col_str or 'men' in col_str or 'male' in col_str:
-                                    visitor_data["demographics"]["Hombres"] = str(value)
-                                elif 'mujeres' in col_str or 'women' in col_str or 'female' in col_str:
-                                    visitor_data["demographics"]["Mujeres"] = str(value)
+                        # Only the last non-empty value of the column is kept
+                        values = column.dropna()
+                        if not values.empty:
+                            value = values.iloc[-1]
+                            if 'hombres' in col_str or 'men' in col_str or 'male' in col_str:
+                                visitor_data["demographics"]["Hombres"] = str(value)
+                            elif 'mujeres' in col_str or 'women' in col_str or 'female' in col_str:
+                                visitor_data["demographics"]["Mujeres"] = str(value)
                 
-                # Extract trends from text content
-                text_content = df.to_string()
-                trends = self._extract_trends(text_content)
+                # Extract trends from text content: the header row, then each row
+                # joined from its present cells instead of formatting the sheet
+                values = df.to_numpy(dtype=object)
+                present = df.notna().to_numpy()
+                text_lines = [" ".join(str(col) for col in df.columns)]
+                text_lines.extend(
+                    " ".join(str(val) for val, is_present in zip(row, row_present) if is_present)
+                    for row, row_present in zip(values, present)
+                )
+                trends = self._extract_trends("\n".join(text_lines))
                 visitor_data["trends"].extend(trends)
             
             return visitor_data
@@ -186,6 +335,11 @@ class VisitorQueryTool:
             logger.error(f"Error extracting visitor data from Excel {file_path}: {str(e)}")
             return visitor_data
     
+    def _to_counts(self, values: pd.Series) -> pd.Series:
+        """Parse a column as visitor counts; cells that are not a non-negative number become NaN"""
+        numbers = pd.to_numeric(values, errors='coerce')
+        return numbers.where((numbers >= 0) & (numbers < float('inf')))
+    
     def _extract_visitor_data_from_text(self, content: str) -> Dict[str, Any]:
         """Extract visitor statistics and information from content"""
         visitor_data = {
@@ -196,11 +350,12 @@ class VisitorQueryTool:
         }
         
         try:
-            content_lower = content.lower()
+            # Patterns are case-insensitive, so the text is scanned as is
+            # rather than through a lowercased copy of the whole document
             
             # Extract total visitor numbers
             for pattern in self.visitor_number_patterns:
-                matches = re.findall(pattern, content_lower, re.IGNORECASE)
+                matches = pattern.findall(content)
                 if matches:
                     # Take the largest number found (likely the total)
                     numbers = [int(match) for match in matches if match.isdigit()]
@@ -208,41 +363,20 @@ class VisitorQueryTool:
                         visitor_data["total_visitors"] = max(numbers)
                         break
             
-            # Extract daily statistics
-            lines = content.split('\n')
-            for line in lines:
-                line_lower = line.lower().strip()
-                
-                # Look for daily patterns
-                for pattern in self.daily_patterns:
-                    matches = re.findall(pattern, line_lower)
-                    if matches:
-                        for match in matches:
-                            if len(match) == 2:  # Day number and visitors
-                                day, visitors = match
-                                if day.isdigit() and visitors.isdigit():
-                                    visitor_data["daily_stats"][f"Día {day}"] = int(visitors)
-                            elif len(match) == 4:  # Date format
-                                day, month, year, visitors = match
-                                if visitors.isdigit():
-                                    date_key = f"{day}/{month}/{year}"
-                                    visitor_data["daily_stats"][date_key] = int(visitors)
-                
-                # Look for demographic information
-                for pattern in self.demographic_patterns:
-                    matches = re.findall(pattern, line_lower)
-                    if matches:
-                        for match in matches:
-                            if 'hombres' in pattern or 'men' in pattern or 'male' in pattern:
-                                visitor_data["demographics"]["Hombres"] = match
-                            elif 'mujeres' in pattern or 'women' in pattern or 'female' in pattern:
-                                visitor_data["demographics"]["Mujeres"] = match
-                            elif 'edad' in pattern or 'age' in pattern:
-                                visitor_data["demographics"]["Edad promedio"] = match
-                            elif 'profesionales' in pattern or 'professionals' in pattern:
-                                visitor_data["demographics"]["Profesionales"] = match
-                            elif 'estudiantes' in pattern or 'students' in pattern:
-                                visitor_data["demographics"]["Estudiantes"] = match
+            # Extract daily statistics and demographics in a single pass
+            for match in self.figure_pattern.finditer(content):
+                figure = match.lastgroup
+                if figure == 'day':
+                    visitor_data["daily_stats"][f"Día {match.group('day_number')}"] = int(match.group('day_visitors'))
+                elif figure == 'date':
+                    date_key = f"{match.group('date_day')}/{match.group('date_month')}/{match.group('date_year')}"
+                    visitor_data["daily_stats"][date_key] = int(match.group('date_visitors'))
+                elif figure == 'weekday':
+                    weekday = match.group('weekday_name').capitalize()
+                    visitor_data["daily_stats"][weekday] = int(match.group('weekday_visitors'))
+                else:
+                    label = self.demographic_labels[figure]
+                    visitor_data["demographics"][label] = match.group(f'{figure}_value')
             
             # Extract trends and insights
             trends = self._extract_trends(content)
@@ -258,30 +392,30 @@ class VisitorQueryTool:
         """Extract visitor trends and insights from content"""
         trends = []
         
-        trend_keywords = [
-            'aumento', 'increase', 'incremento', 'crecimiento', 'growth',
-            'disminución', 'decrease', 'reducción', 'decline',
-            'pico', 'peak', 'máximo', 'maximum',
-            'tendencia', 'trend', 'patrón', 'pattern'
-        ]
-        
         try:
-            lines = content.split('\n')
-            for line in lines:
-                line = line.strip()
+            # Scan the whole document for trend keywords and only look at the
+            # lines they land on, resuming after each of those lines
+            find_trend = self.trend_pattern.search
+            has_digit = self.digit_pattern.search
+            position = 0
+            while len(trends) < 5:  # Limit to 5 trends
+                match = find_trend(content, position)
+                if not match:
+                    break
+                    
+                line_start = content.rfind('\n', 0, match.start()) + 1
+                line_end = content.find('\n', match.end())
+                if line_end == -1:
+                    line_end = len(content)
+                position = line_end + 1
+                
+                line = content[line_start:line_end].strip()
                 if len(line) < 10:  # Skip very short lines
                     continue
                 
-                line_lower = line.lower()
-                
-                # Check if line contains trend keywords
-                if any(keyword in line_lower for keyword in trend_keywords):
-                    # Check if line also contains numbers (likely statistical)
-                    if re.search(r'\d+', line):
-                        trends.append(line)
-                        
-                        if len(trends) >= 5:  # Limit to 5 trends
-                            break
+                # Check if line also contains numbers (likely statistical)
+                if has_digit(line):
+                    trends.append(line)
             
             return trends
             
@@ -307,61 +441,46 @@ class VisitorQueryTool:
             "query": query
         }
         
+        self._ensure_indexed()
         if not self.indexed_data:
             return result
         
         try:
             query_lower = query.lower()
             
-            # Aggregate data from all documents
-            all_visitor_data = []
-            for filename, doc_data in self.indexed_data.items():
-                visitor_data = doc_data.get('visitor_data', {})
-                visitor_data['source_file'] = filename
-                all_visitor_data.append(visitor_data)
+            # Figures are aggregated across documents at index time
+            summary = self.visitor_summary
+            
+            # One pass over the query finds every requested section
+            sections = {
+                section
+                for keyword in self.query_keyword_pattern.findall(query_lower)
+                for section in self.keyword_sections[keyword]
+            }
             
             # Process based on query type
-            if any(keyword in query_lower for keyword in ['total', 'cuantos', 'cantidad']):
+            if 'total' in sections:
                 # Return total visitor numbers
-                totals = [data.get('total_visitors') for data in all_visitor_data 
-                         if data.get('total_visitors')]
-                if totals:
-                    result["total_visitors"] = max(totals)  # Take the highest total
+                result["total_visitors"] = summary["total_visitors"]
             
-            if any(keyword in query_lower for keyword in ['día', 'day', 'diario', 'daily']):
+            if 'daily' in sections:
                 # Aggregate daily statistics
-                for data in all_visitor_data:
-                    daily_stats = data.get('daily_stats', {})
-                    result["daily_stats"].update(daily_stats)
+                result["daily_stats"] = dict(summary["daily_stats"])
             
-            if any(keyword in query_lower for keyword in ['demografía', 'demographics', 'perfil']):
+            if 'demographics' in sections:
                 # Aggregate demographic information
-                for data in all_visitor_data:
-                    demographics = data.get('demographics', {})
-                    result["demographics"].update(demographics)
+                result["demographics"] = dict(summary["demographics"])
             
-            if any(keyword in query_lower for keyword in ['tendencia', 'trend', 'patrón']):
+            if 'trends' in sections:
                 # Aggregate trends
-                for data in all_visitor_data:
-                    trends = data.get('trends', [])
-                    result["trends"].extend(trends)
+                result["trends"] = list(summary["trends"])
             
             # If no specific type requested, return everything
-            if not any(keyword in query_lower for keyword in 
-                      ['total', 'día', 'demografía', 'tendencia']):
-                # Aggregate all data
-                totals = [data.get('total_visitors') for data in all_visitor_data 
-                         if data.get('total_visitors')]
-                if totals:
-                    result["total_visitors"] = max(totals)
-                
-                for data in all_visitor_data:
-                    result["daily_stats"].update(data.get('daily_stats', {}))
-                    result["demographics"].update(data.get('demographics', {}))
-                    result["trends"].extend(data.get('trends', []))
-            
-            # Remove duplicate trends
-            result["trends"] = list(set(result["trends"]))[:5]
+            if 'specific' not in sections:
+                result["total_visitors"] = summary["total_visitors"]
+                result["daily_stats"] = dict(summary["daily_stats"])
+                result["demographics"] = dict(summary["demographics"])
+                result["trends"] = list(summary["trends"])
             
             return result
             
@@ -371,12 +490,14 @@ class VisitorQueryTool:
     
     def refresh_index(self) -> None:
         """Refresh the visitor data index"""
-        self.indexed_data.clear()
-        self.index_documents()
-        logger.info("Visitor data index refreshed")
+        with self._index_lock:
+            self.indexed_data.clear()
+            self._indexed = False
+        logger.info("Visitor data index cleared, documents will be re-indexed on next use")
     
     def get_statistics(self) -> Dict[str, Any]:
         """Get tool statistics"""
+        self._ensure_indexed()
         total_data_points = 0
         for doc_data in self.indexed_data.values():
             visitor_data = doc_data.get('visitor_data', {})